@@ -0,0 +1,58 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from app.db.database import Base, sync_database_url
+from app.models import items, users  # noqa: F401  (register the tables on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# Always migrate the database the application is configured for
+config.set_main_option("sqlalchemy.url", sync_database_url.render_as_string(hide_password=False).replace("%", "%%"))
+target_metadata = Base.metadata
+
+# Raw DDL that is not part of the metadata: the search index
+# (app.models.items.SEARCH_DDL) and the trigger-maintained item_stats table
+# (STATS_DDL, created and backfilled by revision 0004). Autogenerate does not
+# compare triggers or functions, so only their tables and indexes need skipping.
+RAW_DDL_PREFIXES = ("items_fts", "ix_items_search", "item_stats")
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (name or "").startswith(RAW_DDL_PREFIXES)
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        # Batch mode lets ALTER-style operations work on SQLite too
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True,
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,38 @@
+"""full-text search index over item name and description
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.models.items import SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for statement in SEARCH_DDL.get(dialect, []):
+        op.execute(statement)
+    if dialect == "sqlite":
+        # Index the rows that existed before the triggers
+        op.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for trigger in ("items_fts_ai", "items_fts_ad", "items_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS items_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_items_search")
@@ -0,0 +1,36 @@
+"""running item totals maintained by triggers
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.models.items import STATS_DDL, STATS_REBUILD, STATS_TRIGGERS
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect not in STATS_DDL:
+        return
+    for statement in STATS_DDL[dialect] + STATS_REBUILD:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for statement in STATS_TRIGGERS.get(dialect, []):
+        op.execute(statement)
+    if dialect == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS items_stats_apply()")
+    op.execute("DROP TABLE IF EXISTS item_stats")
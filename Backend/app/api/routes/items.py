@@ -1,61 +1,330 @@
-from fastapi import  HTTPException, Path, Query, Depends,APIRouter
+import json
+from fastapi import  Body, HTTPException, Header, Path, Query, Depends,APIRouter,Request,Response
+from pydantic import BaseModel, ValidationError
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List
 from app.crud import items as  crud
-from app.db.database import  get_db
+from app.crud.dispatch import get_crud_db, get_crud_read_db, run_crud
+from app.db.replicas import read_session
 from app.schemas  import items as schemas,users as user_schema
 from app.core.auth import get_current_active_user
+from app.core.pagination import decode_cursor, decode_search_cursor, encode_cursor, encode_search_cursor, parse_order_by
+from app.core import http_cache
+from app.core.export import export_response
+from app.core.serialization import parse_fields
+from app.core.changes import item_changes
+from starlette.responses import StreamingResponse
+from app.core.settings import settings
+from app.db.import_items import import_progress, import_stream
 
 router = APIRouter(
     prefix="/items",
     tags=["items"]
 )
+def item_filters(
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    is_available: bool | None = Query(None),
+    name_prefix: str | None = Query(None, min_length=1, description="Case-sensitive name prefix"),
+    created_after: datetime | None = Query(None, description="Inclusive lower bound; naive times are UTC"),
+    created_before: datetime | None = Query(None, description="Exclusive upper bound"),
+    updated_after: datetime | None = Query(None),
+    updated_before: datetime | None = Query(None),
+) -> schemas.ItemFilters:
+    return schemas.ItemFilters(
+        min_price=min_price,
+        max_price=max_price,
+        is_available=is_available,
+        name_prefix=name_prefix,
+        created_after=created_after,
+        created_before=created_before,
+        updated_after=updated_after,
+        updated_before=updated_before,
+    )
+
 # Items endpoints (public)
 @router.get("/", response_model=List[schemas.Item],tags=["items"])
-def get_items(skip: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
-    """Get all items with pagination"""
-    items = crud.get_items(db, skip=skip, limit=limit)
-    return items
+async def get_items(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Opaque X-Next-Cursor value from the previous page; replaces skip"),
+    sort: str = Query("asc", pattern="^(asc|desc)$", description="Order by id"),
+    order_by: str | None = Query(None, description="Comma-separated sort columns, '-' for descending, e.g. price,-created_at; id breaks ties in the `sort` direction"),
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. id,name,price; defaults to all"),
+    total: bool = Query(False, description="Send the number of matching items in X-Total-Count; only without filters or with is_available alone"),
+    filters: schemas.ItemFilters = Depends(item_filters),
+    db: Session = Depends(get_crud_read_db)
+):
+    """Get all items with pagination, filtering and sorting"""
+    try:
+        after_id = decode_cursor(cursor, sort) if cursor else None
+        ordering = parse_order_by(order_by, crud.ORDER_COLUMNS) if order_by else []
+        selected = parse_fields(fields, crud.ITEM_COLUMNS) if fields else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if after_id is not None and ordering:
+        raise HTTPException(status_code=400, detail="cursor paging only supports ordering by id; use skip with order_by")
+    query = dict(skip=skip, limit=limit, after_id=after_id, sort=sort, filters=filters, order_by=ordering)
+    variant = ",".join(selected) if selected else ""
+    headers = {}
+    if total:
+        # From the maintained stats, never a COUNT(*) over the matching rows
+        count = await run_crud(crud, db, "count_items", filters=filters)
+        if count is None:
+            raise HTTPException(status_code=400, detail="total is only available without filters or with is_available alone")
+        headers["X-Total-Count"] = str(count)
+        variant += f";total={count}"
+    if http_cache.is_conditional(request):
+        # Revalidate from (id, timestamps) alone before loading and serializing rows
+        versions = await run_crud(crud, db, "get_items_versions", **query)
+        etag, last_modified = http_cache.collection_validators(versions, variant)
+        if http_cache.not_modified(request, etag, last_modified):
+            return http_cache.not_modified_response(etag, last_modified)
+    if selected:
+        # Sparse pages select only the requested columns and skip the item cache
+        payload, versions = await run_crud(crud, db, "get_items_fields_payload", fields=selected, **query)
+        item_ids = [version[0] for version in versions]
+        etag, last_modified = http_cache.collection_validators(versions, variant)
+    else:
+        payload, item_ids = await run_crud(crud, db, "get_items_payload", **query)
+        etag, last_modified = http_cache.payload_validators(payload, collection=True, variant=variant)
+    if len(item_ids) == limit and not ordering:
+        headers["X-Next-Cursor"] = encode_cursor(item_ids[-1], sort)
+    return http_cache.json_response(request, payload, etag, last_modified, headers)
+
+@router.get("/search", response_model=List[schemas.Item], tags=["items"])
+async def search_items(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for in name and description"),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Opaque X-Next-Cursor value from the previous page"),
+    prefix: bool = Query(True, description="Also match words that start with each term"),
+    db: Session = Depends(get_crud_read_db)
+):
+    """Full-text search over items, best matches first (name counts more than description)"""
+    try:
+        after = decode_search_cursor(cursor, q) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    try:
+        matches = await run_crud(crud, db, "search_items", q=q, limit=limit, after=after, prefix=prefix)
+    except NotImplementedError as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    payloads = await run_crud(crud, db, "get_item_payloads", item_ids=[item_id for item_id, _ in matches])
+    headers = {}
+    if len(matches) == limit:
+        headers["X-Next-Cursor"] = encode_search_cursor(matches[-1][1], matches[-1][0], q)
+    payload = crud.json_array(payloads[item_id] for item_id, _ in matches if item_id in payloads)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+@router.get("/export", tags=["items"])
+def export_items(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Compress the stream (Content-Encoding: gzip)"),
+    current_user: user_schema.Principal = Depends(get_current_active_user)
+):
+    """Stream every item as NDJSON or CSV (requires authentication)"""
+    return export_response(
+        lambda db: crud.iter_item_rows(db, batch_size=settings.export_batch_size),
+        [column.key for column in crud.EXPORT_COLUMNS],
+        format,
+        gzip,
+        "items",
+        session_scope=lambda: read_session(request),
+    )
+
+@router.get("/changes", tags=["items"], response_class=StreamingResponse)
+async def item_changes_stream(last_event_id: str | None = Header(None, description="Version of the last event received, to resume after it")):
+    """Server-Sent Events stream of item creates, updates and deletes.
+    Each event's id is its version; on reconnect, events missed since
+    Last-Event-ID are replayed, or a `resync` event asks the client to reload
+    the list when they are no longer buffered."""
+    return StreamingResponse(
+        item_changes.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stats", response_model=schemas.ItemStats, tags=["items"])
+async def item_stats(db: Session = Depends(get_crud_read_db)):
+    """Item count, available count and min/max/average price, read from
+    running totals rather than aggregated over every item"""
+    return await run_crud(crud, db, "get_item_stats")
+
+@router.post("/lookup", response_model=schemas.ItemLookupResponse, tags=["items"])
+async def lookup_items(lookup: schemas.ItemLookup, db: Session = Depends(get_crud_read_db)):
+    """Get many items by ID in one call, in the requested order, listing unknown IDs under `missing`"""
+    if len(lookup.ids) > settings.lookup_max_ids:
+        raise HTTPException(status_code=413, detail=f"At most {settings.lookup_max_ids} ids per request")
+    payloads = await run_crud(crud, db, "get_item_payloads", item_ids=lookup.ids, chunk_size=settings.bulk_chunk_size)
+    found = crud.json_array(payloads[item_id] for item_id in lookup.ids if item_id in payloads)
+    missing = json.dumps([item_id for item_id in lookup.ids if item_id not in payloads]).encode()
+    return Response(content=b'{"items":' + found + b',"missing":' + missing + b"}", media_type="application/json")
+
+@router.post("/import", response_model=schemas.ImportReport, tags=["items"])
+async def import_items(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start_line: int = Query(0, ge=0, description="Skip input lines up to this one (a previous checkpoint_line)"),
+    progress: bool = Query(False, description="Stream NDJSON: the checkpoint after each committed batch, then the report"),
+    current_user: user_schema.Principal = Depends(get_current_active_user)
+):
+    """Import items from a streamed NDJSON or CSV body (requires authentication).
+    Valid rows are inserted in batches while the upload is still arriving;
+    invalid rows are listed by line number in the report."""
+    compressed = request.headers.get("content-encoding", "").lower() == "gzip"
+    if progress:
+        return _ImportProgressResponse(import_progress(request.stream(), format, start_line, compressed), media_type="application/x-ndjson")
+    return await import_stream(request.stream(), format, start_line, compressed)
+
+class _ImportProgressResponse(StreamingResponse):
+    """Streams while the request body is still being read. StreamingResponse
+    would also listen for a disconnect, and that listener consumes the
+    body's own receive() messages."""
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+# Bulk endpoints (protected - require authentication)
+BULK_MODE = Query("atomic", pattern="^(atomic|best_effort)$", description="atomic: all rows or none; best_effort: apply every valid row")
+
+def _validate_rows(rows: List[Dict[str, Any]], schema: type[BaseModel]):
+    """Validate each row on its own so one bad row does not reject the whole batch"""
+    if len(rows) > settings.bulk_max_batch_size:
+        raise HTTPException(status_code=413, detail=f"At most {settings.bulk_max_batch_size} rows per request")
+    valid, invalid = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, schema.model_validate(row)))
+        except ValidationError as exc:
+            error = "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors())
+            invalid.append(schemas.BulkItemResult(index=index, status="invalid", error=error))
+    return valid, invalid
+
+def _bulk_response(mode: str, indexes: List[int], outcomes, invalid: List[schemas.BulkItemResult]):
+    results = invalid + [
+        schemas.BulkItemResult(index=index, id=item_id, status=status, error=error)
+        for index, (item_id, status, error) in zip(indexes, outcomes)
+    ]
+    results.sort(key=lambda result: result.index)
+    failed = sum(result.error is not None for result in results)
+    return schemas.BulkItemResponse(mode=mode, succeeded=len(results) - failed, failed=failed, results=results)
+
+async def _run_bulk(mode: str, valid, invalid, operation):
+    indexes = [index for index, _ in valid]
+    atomic = mode == "atomic"
+    if atomic and invalid:
+        raise HTTPException(status_code=422, detail=[result.model_dump() for result in invalid])
+    try:
+        outcomes = await operation([row for _, row in valid], atomic, settings.bulk_chunk_size)
+    except crud.BulkAbortedError as exc:
+        failures = [
+            {"index": indexes[position] if len(exc.outcomes) == len(indexes) else None, "id": item_id, "status": status, "error": error}
+            for position, (item_id, status, error) in enumerate(exc.outcomes) if error is not None
+        ]
+        raise HTTPException(status_code=409, detail={"message": "No rows were applied", "failures": failures})
+    return _bulk_response(mode, indexes, outcomes, invalid)
+
+@router.post("/bulk", response_model=schemas.BulkItemResponse, tags=["items"])
+async def bulk_create_items(
+    rows: List[Dict[str, Any]] = Body(..., description="ItemCreate payloads"),
+    mode: str = BULK_MODE,
+    db: Session = Depends(get_crud_db),
+    current_user: user_schema.Principal = Depends(get_current_active_user)
+):
+    """Create many items in chunked transactions (requires authentication)"""
+    valid, invalid = _validate_rows(rows, schemas.ItemCreate)
+    return await _run_bulk(mode, valid, invalid, lambda items, atomic, chunk_size: run_crud(crud, db, "bulk_create_items", items=items, atomic=atomic, chunk_size=chunk_size))
+
+@router.patch("/bulk", response_model=schemas.BulkItemResponse, tags=["items"])
+async def bulk_update_items(
+    rows: List[Dict[str, Any]] = Body(..., description="ItemUpdate payloads, each with the item id"),
+    mode: str = BULK_MODE,
+    db: Session = Depends(get_crud_db),
+    current_user: user_schema.Principal = Depends(get_current_active_user)
+):
+    """Partially update many items in chunked transactions (requires authentication)"""
+    valid, invalid = _validate_rows(rows, schemas.ItemBulkUpdate)
+    return await _run_bulk(mode, valid, invalid, lambda items, atomic, chunk_size: run_crud(crud, db, "bulk_update_items", items=items, atomic=atomic, chunk_size=chunk_size))
+
+@router.delete("/bulk", response_model=schemas.BulkItemResponse, tags=["items"])
+async def bulk_delete_items(
+    payload: schemas.ItemBulkDelete,
+    mode: str = BULK_MODE,
+    db: Session = Depends(get_crud_db),
+    current_user: user_schema.Principal = Depends(get_current_active_user)
+):
+    """Delete many items in chunked transactions (requires authentication)"""
+    if len(payload.ids) > settings.bulk_max_batch_size:
+        raise HTTPException(status_code=413, detail=f"At most {settings.bulk_max_batch_size} rows per request")
+    valid = list(enumerate(payload.ids))
+    return await _run_bulk(mode, valid, [], lambda item_ids, atomic, chunk_size: run_crud(crud, db, "bulk_delete_items", item_ids=item_ids, atomic=atomic, chunk_size=chunk_size))
 
 @router.get("/{item_id}", response_model=schemas.Item,tags=["items"])
-def get_item(item_id: int = Path(..., gt=0), db: Session = Depends(get_db)):
+async def get_item(request: Request, item_id: int = Path(..., gt=0), db: Session = Depends(get_crud_read_db)):
     """Get a specific item by ID"""
-    item = crud.get_item(db, item_id=item_id)
-    if item is None:
-        raise HTTPException(status_code=404, detail="Item not found")
-    return item
+    payload = crud.peek_item_payload(item_id)
+    if payload is None and http_cache.is_conditional(request):
+        version = await run_crud(crud, db, "get_item_version", item_id=item_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        etag, last_modified = http_cache.resource_validators(version)
+        if http_cache.not_modified(request, etag, last_modified):
+            return http_cache.not_modified_response(etag, last_modified)
+    if payload is None:
+        payload = await run_crud(crud, db, "get_item_payload", item_id=item_id)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+    etag, last_modified = http_cache.payload_validators(payload)
+    return http_cache.json_response(request, payload, etag, last_modified)
 
 # Items endpoints (protected - require authentication)
 @router.post("/", response_model=schemas.Item, status_code=201,tags=["items"])
-def create_item(
+async def create_item(
     item: schemas.ItemCreate, 
-    db: Session = Depends(get_db),
-    current_user: user_schema.User = Depends(get_current_active_user)
+    db: Session = Depends(get_crud_db),
+    current_user: user_schema.Principal = Depends(get_current_active_user)
 ):
     """Create a new item (requires authentication)"""
-    return crud.create_item(db=db, item=item)
+    return await run_crud(crud, db, "create_item", item=item)
 
 @router.put("/{item_id}", response_model=schemas.Item,tags=["items"])
-def update_item(
+async def update_item(
+    response: Response,
     item_id: int = Path(..., gt=0), 
     item: schemas.ItemUpdate = None, 
-    db: Session = Depends(get_db),
-    current_user: user_schema.User = Depends(get_current_active_user)
+    if_match: str | None = Header(None, description="Only update if the item still has this ETag"),
+    db: Session = Depends(get_crud_db),
+    current_user: user_schema.Principal = Depends(get_current_active_user)
 ):
     """Update an existing item (requires authentication)"""
-    db_item = crud.update_item(db, item_id=item_id, item=item)
+    expected_version = None
+    if if_match is not None:
+        expected_version = await run_crud(crud, db, "get_item_version", item_id=item_id)
+        if expected_version is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if not http_cache.etag_matches(if_match, http_cache.resource_validators(expected_version)[0], weak=False):
+            raise HTTPException(status_code=412, detail="Item has been modified")
+    try:
+        db_item = await run_crud(crud, db, "update_item", item_id=item_id, item=item, expected_version=expected_version)
+    except crud.StaleItemError:
+        raise HTTPException(status_code=412, detail="Item has been modified")
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
+    etag, last_modified = http_cache.resource_validators((db_item.id, db_item.created_at, db_item.updated_at))
+    response.headers.update(http_cache.validator_headers(etag, last_modified))
     return db_item
 
 @router.delete("/{item_id}",tags=["items"])
-def delete_item(
+async def delete_item(
     item_id: int = Path(..., gt=0), 
-    db: Session = Depends(get_db),
-    current_user: user_schema.User = Depends(get_current_active_user)
+    db: Session = Depends(get_crud_db),
+    current_user: user_schema.Principal = Depends(get_current_active_user)
 ):
     """Delete an item (requires authentication)"""
-    db_item = crud.delete_item(db, item_id=item_id)
+    db_item = await run_crud(crud, db, "delete_item", item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return {"message": f"Item {db_item.name} deleted successfully"}
\ No newline at end of file
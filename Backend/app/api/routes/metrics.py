@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Response
+from sqlalchemy.pool import QueuePool
+
+from app.core import metrics
+from app.core.admission import admission_gates
+from app.core.cache import item_cache
+from app.core.changes import item_changes
+from app.db.database import async_engine, engine, session_counters
+from app.db.replicas import read_router
+
+router = APIRouter(tags=["metrics"])
+
+def _engines():
+    yield "primary", engine
+    if async_engine is not None:
+        yield "primary-async", async_engine.sync_engine
+    for replica in read_router.replicas:
+        yield f"replica:{replica.name}", replica.engine
+
+def _pool_values(read) -> dict:
+    return {
+        (label,): read(db_engine.pool)
+        for label, db_engine in _engines()
+        if isinstance(db_engine.pool, QueuePool)
+    }
+
+# Read at scrape time, so they cost nothing per request
+metrics.registry.gauge("db_pool_size", "Connections the pool keeps open", ("engine",), lambda: _pool_values(lambda pool: pool.size()))
+metrics.registry.gauge("db_pool_checked_out", "Connections currently in use", ("engine",), lambda: _pool_values(lambda pool: pool.checkedout()))
+metrics.registry.gauge("db_pool_overflow", "Connections open beyond pool_size (negative while the pool is filling)", ("engine",), lambda: _pool_values(lambda pool: pool.overflow()))
+metrics.registry.callback_counter(
+    "db_sessions_total", "Sessions handed to handlers (provided) and actually opened (opened)", ("state",),
+    lambda: {("provided",): session_counters.provided, ("opened",): session_counters.opened},
+)
+metrics.registry.callback_counter(
+    "item_cache_events_total", "Item cache lookups and evictions", ("event",),
+    lambda: {(event,): count for event, count in item_cache.stats().items()},
+)
+metrics.registry.gauge(
+    "admission_in_flight", "Admitted requests running, by class", ("class",),
+    lambda: {(name,): gate.active for name, gate in admission_gates.items()},
+)
+metrics.registry.gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot, by class", ("class",),
+    lambda: {(name,): gate.queued for name, gate in admission_gates.items()},
+)
+metrics.registry.gauge(
+    "item_change_subscribers", "Open GET /items/changes streams", (),
+    lambda: {(): item_changes.subscribers},
+)
+metrics.registry.callback_counter(
+    "item_change_events_total", "Change events buffered (published) and resync events sent (resyncs)", ("event",),
+    lambda: {(event,): count for event, count in item_changes.stats().items()},
+)
+metrics.registry.gauge(
+    "db_replica_healthy", "1 while a read replica passes health checks", ("replica",),
+    lambda: {(replica.name,): int(replica.healthy) for replica in read_router.replicas},
+)
+metrics.registry.gauge(
+    "db_replica_in_flight", "Read sessions open against a replica", ("replica",),
+    lambda: {(replica.name,): replica.in_flight for replica in read_router.replicas},
+)
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Prometheus text exposition of the process's metrics"""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,21 +1,27 @@
 from fastapi import APIRouter,HTTPException,Depends
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.crud import users as crud
 from app.schemas import users as schemas
-from app.db.database import get_db
+from app.crud.dispatch import get_crud_db, rollback, run_crud
 
 router = APIRouter(
     prefix="/register",
     tags=["register"]
 )
 @router.post("/", response_model=schemas.User, status_code=201)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    """Register a new user"""
-    db_user = crud.get_user_by_email(db, email=user.email)
-    if db_user:
+async def register_user(user: schemas.UserCreate, db: Session = Depends(get_crud_db)):
+    """Register a new user. The INSERT runs first and the unique indexes on
+    email and username reject duplicates, so a new user costs one statement;
+    the conflicting field is only looked up after a rejection."""
+    try:
+        return await run_crud(crud, db, "create_user", user=user)
+    except IntegrityError:
+        await rollback(db)
+    if await run_crud(crud, db, "get_user_by_email", email=user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    db_user = crud.get_user_by_username(db, username=user.username)
-    if db_user:
+    if await run_crud(crud, db, "get_user_by_username", username=user.username):
         raise HTTPException(status_code=400, detail="Username already taken")
-    return crud.create_user(db=db, user=user)
+    # The conflicting user was deleted in the meantime
+    raise HTTPException(status_code=409, detail="Registration conflicted with a concurrent change, please retry")
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, HTTPException, Path, Query, Depends
+from fastapi import APIRouter, HTTPException, Path, Query, Depends, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.crud import users as crud
 
-from app.db.database import get_db
+from app.crud.dispatch import get_crud_db, get_crud_read_db, run_crud
+from app.db.replicas import read_session
 from app.core.auth import get_current_active_user
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import parse_fields
+from app.core import http_cache
+from app.core.settings import settings
+from app.core.export import export_response
 
 from app.schemas  import users as schemas
 
@@ -15,55 +21,136 @@ router = APIRouter(
 )
 
 @router.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: schemas.User = Depends(get_current_active_user)):
+async def read_users_me(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_crud_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
     """Get current user profile"""
-    return current_user
+    if http_cache.is_conditional(request):
+        version = await run_crud(crud, db, "get_user_version", user_id=current_user.id)
+        if version is not None:
+            etag, last_modified = http_cache.resource_validators(version)
+            if http_cache.not_modified(request, etag, last_modified):
+                return http_cache.not_modified_response(etag, last_modified)
+    user = await run_crud(crud, db, "get_user", user_id=current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    _set_validators(response, user)
+    return user
+
+def _set_validators(response: Response, user) -> None:
+    etag, last_modified = http_cache.resource_validators((user.id, user.created_at, user.updated_at))
+    response.headers.update(http_cache.validator_headers(etag, last_modified))
 
 # Users endpoints (protected - require authentication)
 @router.get("/", response_model=List[schemas.User])
-def get_users(
+async def get_users(
+    request: Request,
     skip: int = Query(0, ge=0), 
     limit: int = Query(10, ge=1, le=100), 
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_active_user)
+    cursor: str | None = Query(None, description="Opaque X-Next-Cursor value from the previous page; replaces skip"),
+    sort: str = Query("asc", pattern="^(asc|desc)$", description="Order by id"),
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. id,username; defaults to all"),
+    db: Session = Depends(get_crud_read_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     """Get all users with pagination (requires authentication)"""
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+    try:
+        after_id = decode_cursor(cursor, sort) if cursor else None
+        selected = parse_fields(fields, crud.USER_COLUMNS) if fields else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    variant = ",".join(selected) if selected else ""
+    if http_cache.is_conditional(request):
+        versions = await run_crud(crud, db, "get_users_versions", skip=skip, limit=limit, after_id=after_id, sort=sort)
+        etag, last_modified = http_cache.collection_validators(versions, variant)
+        if http_cache.not_modified(request, etag, last_modified):
+            return http_cache.not_modified_response(etag, last_modified)
+    # The response is already JSON; response_model only documents its shape
+    payload, versions = await run_crud(crud, db, "get_users_payload", fields=selected, skip=skip, limit=limit, after_id=after_id, sort=sort)
+    headers = {}
+    if len(versions) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(versions[-1][0], sort)
+    etag, last_modified = http_cache.collection_validators(versions, variant)
+    return http_cache.json_response(request, payload, etag, last_modified, headers)
+
+@router.get("/export")
+def export_users(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Compress the stream (Content-Encoding: gzip)"),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    """Stream every user as NDJSON or CSV (requires authentication)"""
+    return export_response(
+        lambda db: crud.iter_user_rows(db, batch_size=settings.export_batch_size),
+        [column.key for column in crud.EXPORT_COLUMNS],
+        format,
+        gzip,
+        "users",
+        session_scope=lambda: read_session(request),
+    )
+
+@router.post("/lookup", response_model=schemas.UserLookupResponse)
+async def lookup_users(
+    lookup: schemas.UserLookup,
+    db: Session = Depends(get_crud_read_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    """Get many users by ID in one call, in the requested order (requires authentication)"""
+    if len(lookup.ids) > settings.lookup_max_ids:
+        raise HTTPException(status_code=413, detail=f"At most {settings.lookup_max_ids} ids per request")
+    users = await run_crud(crud, db, "get_users_by_ids", user_ids=lookup.ids, chunk_size=settings.bulk_chunk_size)
+    return {
+        "users": [users[user_id] for user_id in lookup.ids if user_id in users],
+        "missing": [user_id for user_id in lookup.ids if user_id not in users],
+    }
 
 @router.get("/{user_id}", response_model=schemas.User)
-def get_user(
+async def get_user(
+    request: Request,
+    response: Response,
     user_id: int = Path(..., gt=0), 
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_active_user)
+    db: Session = Depends(get_crud_read_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     """Get a specific user by ID (requires authentication)"""
-    user = crud.get_user(db, user_id=user_id)
+    if http_cache.is_conditional(request):
+        version = await run_crud(crud, db, "get_user_version", user_id=user_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        etag, last_modified = http_cache.resource_validators(version)
+        if http_cache.not_modified(request, etag, last_modified):
+            return http_cache.not_modified_response(etag, last_modified)
+    user = await run_crud(crud, db, "get_user", user_id=user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    _set_validators(response, user)
     return user
 
 @router.put("/{user_id}", response_model=schemas.User)
-def update_user(
+async def update_user(
     user_id: int = Path(..., gt=0), 
     user: schemas.UserUpdate = None, 
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_active_user)
+    db: Session = Depends(get_crud_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     """Update an existing user (requires authentication)"""
-    db_user = crud.update_user(db, user_id=user_id, user=user)
+    db_user = await run_crud(crud, db, "update_user", user_id=user_id, user=user)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.delete("/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: int = Path(..., gt=0), 
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_active_user)
+    db: Session = Depends(get_crud_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     """Delete a user (requires authentication)"""
-    db_user = crud.delete_user(db, user_id=user_id)
+    db_user = await run_crud(crud, db, "delete_user", user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": f"User {db_user.username} deleted successfully"}
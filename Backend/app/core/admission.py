@@ -0,0 +1,151 @@
+"""Admission control: per-class concurrency budgets in front of the app.
+
+Each request falls in a class with its own budget. `read` covers GET and
+HEAD; `write` covers other methods, which hold a database connection for
+a transaction; `auth` covers /token and /register, which wait on bcrypt.
+A request runs at once while its class is under its limit. Otherwise it
+waits in a bounded FIFO queue until a slot frees up or the queue deadline
+passes. When the queue is full, or the deadline passes, it gets an
+immediate 503 with Retry-After. So under overload, the requests that are
+admitted keep their usual latency and the excess fails fast, instead of
+every request queueing in the threadpool and the connection pool until it
+times out.
+
+Budgets are per worker process. Long-lived streams (the change feed, the
+exports and POST /items/import) and the /metrics scrape are exempt: a
+stream would hold a slot for its whole duration.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.settings import settings
+
+READ_METHODS = frozenset(("GET", "HEAD"))
+
+class Gate:
+    """Budget of one request class. Up to `limit` requests run at once and
+    up to `queue_size` more wait, in arrival order, for at most `timeout`
+    seconds. A freed slot is handed straight to the oldest waiter."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """None once admitted, else why the request is shed: "queue_full" or "timeout" """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=self.timeout)
+        except BaseException:
+            # Cancelled while waiting (the client went away): give back a slot handed over meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._drop(waiter)
+            raise
+        if waiter.done():
+            return None
+        self._drop(waiter)
+        return "timeout"
+
+    def _drop(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+def make_gates() -> Dict[str, Gate]:
+    return {
+        name: Gate(
+            name,
+            getattr(settings, f"admission_{name}_limit"),
+            getattr(settings, f"admission_{name}_queue"),
+            getattr(settings, f"admission_{name}_timeout_seconds"),
+        )
+        for name in ("read", "write", "auth")
+    }
+
+def request_class(scope: Scope) -> Optional[str]:
+    """Budget a request draws from, or None when it is exempt"""
+    path = scope["path"].rstrip("/") or "/"
+    if path in settings.admission_exempt_paths or scope["method"] == "OPTIONS":
+        return None
+    if path in settings.admission_auth_paths:
+        return "auth"
+    return "read" if scope["method"] in READ_METHODS else "write"
+
+class AdmissionMiddleware:
+    """Admit requests within their class's budget, shed the rest with 503"""
+
+    def __init__(self, app: ASGIApp, gates: Dict[str, Gate], classify: Callable[[Scope], Optional[str]] = request_class, retry_after: int = 1):
+        self.app = app
+        self.gates = gates
+        self.classify = classify
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = self.classify(scope)
+        gate = self.gates.get(name) if name is not None else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        reason = await gate.acquire()
+        metrics.admission_queue_wait.observe(time.perf_counter() - started, name)
+        if reason is not None:
+            metrics.admission_shed.inc(name, reason)
+            await self._shed(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    async def _shed(self, send: Send) -> None:
+        body = json.dumps({"detail": "Server is busy, please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# Budgets of this worker, read by the /metrics gauges
+admission_gates = make_gates()
@@ -4,20 +4,26 @@ from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.settings import settings
-from app.core.security import verify_password,oauth2_scheme
+from app.core.security import verify_and_update_password_async,oauth2_scheme
+from app.core.cache import principal_cache, token_versions
 from app.schemas import users as  user_schema
-from app.db.database import get_db
+from app.crud.dispatch import get_crud_db, run_crud
 
 from app.crud import  users as crud_user
 
-def authenticate_user(db: Session, username: str, password: str):
+async def authenticate_user(db: Session, username: str, password: str):
     """Authenticate a user with username and password"""
-    user = crud_user.get_user_by_username(db, username=username)
+    user = await run_crud(crud_user, db, "get_user_by_username", username=username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    principal = user_schema.Principal.model_validate(user)
+    verified, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not verified:
         return False
-    return user
+    if new_hash:
+        # The hash predates the current bcrypt cost factor
+        await run_crud(crud_user, db, "rehash_user_password", user_id=user.id, hashed_password=new_hash)
+    return principal
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """Create a JWT access token"""
@@ -30,7 +36,26 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def principal_claims(user) -> dict:
+    """Claims that let a token stand in for a database lookup of its user"""
+    return {
+        "sub": user.username,
+        "uid": user.id,
+        "active": user.is_active,
+        "ver": user.token_version or 0,
+    }
+
+def _principal_from_claims(payload: dict) -> user_schema.Principal | None:
+    if not all(claim in payload for claim in ("uid", "active", "ver")):
+        return None
+    return user_schema.Principal(
+        id=payload["uid"],
+        username=payload["sub"],
+        is_active=payload["active"],
+        token_version=payload["ver"],
+    )
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_crud_db)):
     """Get the current authenticated user"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,13 +70,33 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = user_schema.TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = crud_user.get_user_by_username(db, username=token_data.username)
-    if user is None:
+
+    principal = principal_cache.get(token_data.username)
+    if principal is None and settings.auth_stateless_tokens:
+        principal = _principal_from_claims(payload)
+        if principal is not None:
+            # The claims are trusted except for `ver`, which must match the
+            # user's current version so password changes and deletion revoke the token
+            version = token_versions.get(principal.id)
+            if version is None:
+                version = await run_crud(crud_user, db, "get_token_version", user_id=principal.id)
+                if version is None:
+                    raise credentials_exception
+                token_versions.set(principal.id, version)
+            principal = principal.model_copy(update={"token_version": version})
+    if principal is None:
+        user = await run_crud(crud_user, db, "get_user_by_username", username=token_data.username)
+        if user is None:
+            raise credentials_exception
+        principal = user_schema.Principal.model_validate(user)
+        principal_cache.set(token_data.username, principal)
+    # Tokens issued before a password/username change carry an older version
+    if payload.get("ver", 0) != principal.token_version:
         raise credentials_exception
-    return user
+    return principal
 
-async def get_current_active_user(current_user: user_schema.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: user_schema.Principal = Depends(get_current_user)):
     """Get the current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user
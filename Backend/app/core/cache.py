@@ -0,0 +1,417 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from app.core.settings import settings
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Any], bool]) -> None:
+        """Drop every entry whose value matches `predicate`"""
+        with self._lock:
+            for key in [key for key, (_, value) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend:
+    """Storage behind a ReadThroughCache: byte values with a TTL, plus named
+    version counters used to invalidate whole groups of keys at once"""
+
+    evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def version(self, name: str) -> int:
+        raise NotImplementedError
+
+    def bump_version(self, name: str) -> int:
+        raise NotImplementedError
+
+    def set_if_version(self, key: str, value: bytes, ttl: float, name: str, version: int) -> bool:
+        """Store `value` only while the `name` counter still reads `version`.
+        This fallback re-checks after the write and takes the value back when
+        a bump landed in between; backends override it with an atomic check."""
+        if self.version(name) != version:
+            return False
+        self.set(key, value, ttl)
+        if self.version(name) != version:
+            self.delete(key)
+            return False
+        return True
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU bounded by both entry count and total payload bytes"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def set_if_version(self, key: str, value: bytes, ttl: float, name: str, version: int) -> bool:
+        # bump_version takes the same lock, so no invalidation can slip between check and store
+        with self._lock:
+            if self._versions.get(name, 0) != version:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def _store(self, key: str, value: bytes, ttl: float) -> None:
+        size = len(key) + len(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        self._pop(key)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self.size_bytes += size
+        while len(self._data) > self.max_entries or self.size_bytes > self.max_bytes:
+            self._pop(next(iter(self._data)))
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size_bytes = 0
+
+    def version(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def bump_version(self, name: str) -> int:
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return self._versions[name]
+
+    def _pop(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(key) + len(entry[1])
+
+
+class SQLiteSharedBackend(CacheBackend):
+    """Local stand-in for a shared cache server: a SQLite file that every worker
+    process on the host reads and writes, so invalidations are seen by all of them"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+
+    def set_if_version(self, key: str, value: bytes, ttl: float, name: str, version: int) -> bool:
+        # One statement, so the version check and the write are atomic across processes
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) SELECT ?, ?, ? "
+                "WHERE COALESCE((SELECT version FROM versions WHERE name = ?), 0) = ?",
+                (key, value, time.time() + ttl, name, version),
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def version(self, name: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM versions WHERE name = ?", (name,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def bump_version(self, name: str) -> int:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO versions (name, version) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                (name,),
+            )
+            return self._conn.execute("SELECT version FROM versions WHERE name = ?", (name,)).fetchone()[0]
+
+
+class _Flight:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Optional[bytes] = None
+        self.error: Optional[BaseException] = None
+
+
+class ReadThroughCache:
+    """Caches serialized payloads in a backend and loads misses through a callback.
+
+    Concurrent misses on the same key are coalesced so only one caller hits the
+    database. Every write bumps the namespace version; a load that started
+    before the bump is returned to its caller but never stored, so a slow
+    reader cannot put a stale row back after an invalidation."""
+
+    def __init__(self, backend: CacheBackend, ttl: float, namespace: str, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.namespace = namespace
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, _Flight] = {}
+        self._async_inflight: Dict[str, "asyncio.Future[Optional[bytes]]"] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self.backend.version(self.namespace)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        value = self.backend.get(self._key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value: bytes, version: Optional[int] = None) -> None:
+        """Store a value, unless the namespace was invalidated since `version` was read"""
+        if not self.enabled:
+            return
+        if version is None:
+            self.backend.set(self._key(key), value, self.ttl)
+        else:
+            self.backend.set_if_version(self._key(key), value, self.ttl, self.namespace, version)
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[bytes]], store: bool = True) -> Optional[bytes]:
+        """Cached value for `key`, or the loader's result. With `store=False` a
+        loaded value is shared with concurrent callers but not cached."""
+        if not self.enabled:
+            return loader()
+        value = self.backend.get(self._key(key))
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            self.coalesced += 1
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self.misses += 1
+        version = self.version
+        try:
+            value = loader()
+            if value is not None and store:
+                self.set(key, value, version)
+            flight.value = value
+            return value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
+
+    async def get_or_load_async(self, key: str, loader: Callable[[], Awaitable[Optional[bytes]]], store: bool = True) -> Optional[bytes]:
+        """get_or_load for coroutines on the event loop: concurrent misses
+        await the leader's future instead of blocking a thread on an Event.
+        Coalesces within one loop; the sync callers have their own flights."""
+        if not self.enabled:
+            return await loader()
+        value = self.backend.get(self._key(key))
+        if value is not None:
+            self.hits += 1
+            return value
+
+        flight = self._async_inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            # shield: a cancelled follower must not cancel the leader's load
+            return await asyncio.shield(flight)
+
+        self.misses += 1
+        flight = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+        version = self.version
+        try:
+            value = await loader()
+            if value is not None and store:
+                self.set(key, value, version)
+            flight.set_result(value)
+            return value
+        except BaseException as exc:
+            flight.set_exception(exc)
+            # Followers re-raise it; without one, the future must not log "never retrieved"
+            flight.exception()
+            raise
+        finally:
+            del self._async_inflight[key]
+
+    def invalidate(self, *keys: str) -> None:
+        """Drop the given keys and every key derived from the namespace version"""
+        if not self.enabled:
+            return
+        self.backend.bump_version(self.namespace)
+        for key in keys:
+            self.backend.delete(self._key(key))
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.backend.bump_version(self.namespace)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.backend.evictions,
+        }
+
+
+def make_cache_backend(kind: str) -> CacheBackend:
+    if kind == "sqlite":
+        return SQLiteSharedBackend(settings.item_cache_shared_path)
+    return MemoryBackend(
+        max_entries=settings.item_cache_max_entries,
+        max_bytes=settings.item_cache_max_bytes,
+    )
+
+
+# Authenticated principals keyed by the token subject (username)
+principal_cache = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+)
+
+# Current users.token_version keyed by user id, checked against the `ver`
+# claim of stateless tokens. crud.users drops an entry when it bumps the
+# version or deletes the user, so this worker sees the revocation at once.
+token_versions = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+)
+
+# Serialized schemas.Item payloads, filled by app.crud.items
+item_cache = ReadThroughCache(
+    make_cache_backend(settings.item_cache_backend) if settings.item_cache_enabled else MemoryBackend(0, 0),
+    ttl=settings.item_cache_ttl_seconds,
+    namespace="items",
+    enabled=settings.item_cache_enabled,
+)
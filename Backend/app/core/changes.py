@@ -0,0 +1,299 @@
+"""Item change feed behind GET /items/changes (Server-Sent Events).
+
+crud.items publishes an event after every committed create, update and
+delete. A broker gives each event a version, increasing across the whole
+deployment, and hands it to the ChangeFeed of every worker. The feed keeps
+the newest events in a bounded ring buffer and wakes its subscribers.
+
+Subscribers hold no queue of their own. Each one remembers the last version
+it sent and waits on a future that the feed shares between all of them and
+replaces on every publish. An idle connection costs one suspended generator,
+and a burst of writes costs one wake-up per subscriber. A client that
+reconnects with Last-Event-ID gets the events it missed from the ring
+buffer. If they have already been dropped, or the id belongs to an earlier
+run, it gets a `resync` event telling it to reload the list.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Iterable, List, Optional, Tuple
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# (kind, item id, serialized schemas.Item or None) as handed to ChangeBroker.publish
+Change = Tuple[str, int, Optional[bytes]]
+
+class ChangeEvent:
+    """One committed change. `item` is the serialized item after the write;
+    bulk writes and deletes carry only the id."""
+
+    __slots__ = ("version", "kind", "item_id", "item", "_frame")
+
+    def __init__(self, version: int, kind: str, item_id: int, item: Optional[bytes] = None):
+        self.version = version
+        self.kind = kind
+        self.item_id = item_id
+        self.item = item
+        self._frame: Optional[bytes] = None
+
+    def frame(self) -> bytes:
+        """The event as an SSE frame, encoded once however many subscribers send it"""
+        if self._frame is None:
+            data = b'{"version":%d,"type":"%s","id":%d,"item":%s}' % (self.version, self.kind.encode(), self.item_id, self.item or b"null")
+            self._frame = b"id: %d\nevent: %s\ndata: %s\n\n" % (self.version, self.kind.encode(), data)
+        return self._frame
+
+def control_frame(kind: str, version: int) -> bytes:
+    """A `ready` or `resync` frame; its id lets the client resume from `version`"""
+    return b'id: %d\nevent: %s\ndata: {"version":%d}\n\n' % (version, kind.encode(), version)
+
+
+class ChangeBroker:
+    """Carries change events from the worker that committed a write to the
+    feeds of every worker, assigning the versions on the way"""
+
+    def publish(self, changes: List[Change]) -> None:
+        raise NotImplementedError
+
+    def start(self, deliver: Callable[[ChangeEvent], None]) -> int:
+        """Begin delivering events to `deliver`; returns the current version"""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        pass
+
+
+class MemoryBroker(ChangeBroker):
+    """Delivers within the process; enough for a single worker"""
+
+    def __init__(self):
+        self._version = 0
+        self._deliver: Optional[Callable[[ChangeEvent], None]] = None
+        self._lock = threading.Lock()
+
+    def publish(self, changes: List[Change]) -> None:
+        with self._lock:
+            for kind, item_id, item in changes:
+                self._version += 1
+                if self._deliver is not None:
+                    self._deliver(ChangeEvent(self._version, kind, item_id, item))
+
+    def start(self, deliver: Callable[[ChangeEvent], None]) -> int:
+        with self._lock:
+            self._deliver = deliver
+            return self._version
+
+
+class SQLiteBroker(ChangeBroker):
+    """Local stand-in for a pub/sub server (Redis streams, Postgres
+    LISTEN/NOTIFY): workers on the host append to a log table in a shared
+    SQLite file, whose rowid is the version, and each polls it in a
+    background thread. Only the newest `retain` rows are kept."""
+
+    def __init__(self, path: str, poll_interval: float = 0.5, retain: int = 10000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.retain = retain
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes (version INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, item_id INTEGER, item BLOB)"
+        )
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, changes: List[Change]) -> None:
+        with self._lock:
+            cursor = self._conn.executemany("INSERT INTO changes (kind, item_id, item) VALUES (?, ?, ?)", changes)
+            last = cursor.lastrowid
+            if last and last % 100 < len(changes):
+                self._conn.execute("DELETE FROM changes WHERE version <= ?", (last - self.retain,))
+
+    def _fetch(self, after: int, limit: int = 1000) -> List[ChangeEvent]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, kind, item_id, item FROM changes WHERE version > ? ORDER BY version LIMIT ?", (after, limit)
+            ).fetchall()
+        return [ChangeEvent(*row) for row in rows]
+
+    def start(self, deliver: Callable[[ChangeEvent], None]) -> int:
+        with self._lock:
+            seen = self._conn.execute("SELECT COALESCE(MAX(version), 0) FROM changes").fetchone()[0]
+        if self._thread is not None:
+            return seen
+        self._stop.clear()
+
+        def poll(after: int) -> None:
+            while not self._stop.wait(self.poll_interval):
+                try:
+                    events = self._fetch(after)
+                except sqlite3.Error:
+                    logger.exception("Polling the item change log failed")
+                    continue
+                for event in events:
+                    deliver(event)
+                    after = event.version
+
+        self._thread = threading.Thread(target=poll, args=(seen,), name="item-changes", daemon=True)
+        self._thread.start()
+        return seen
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class ChangeFeed:
+    """Per-process ring buffer of recent events and the subscribers streaming them"""
+
+    def __init__(self, broker: ChangeBroker, capacity: int = 1000, keepalive: float = 15.0, max_stream_seconds: float = 300.0, retry_ms: int = 3000, enabled: bool = True):
+        self.broker = broker
+        self.keepalive = keepalive
+        self.max_stream_seconds = max_stream_seconds
+        self.retry_ms = retry_ms
+        self.enabled = enabled
+        self.subscribers = 0
+        self.published = 0
+        self.resyncs = 0
+        self.last_version = 0
+        self._events: Deque[ChangeEvent] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._started = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next: Optional[asyncio.Future] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started or not self.enabled:
+                return
+            self._started = True
+        version = self.broker.start(self._append)
+        with self._lock:
+            self.last_version = max(self.last_version, version)
+
+    def stop(self) -> None:
+        self.broker.stop()
+        self._started = False
+
+    def publish(self, changes: Iterable[Change]) -> None:
+        """Publish committed changes; called by crud.items after the commit"""
+        if not self.enabled:
+            return
+        changes = list(changes)
+        if changes:
+            self.broker.publish(changes)
+
+    def _append(self, event: ChangeEvent) -> None:
+        # Runs on whichever thread the broker delivers from
+        with self._lock:
+            if event.version <= self.last_version:
+                return
+            self._events.append(event)
+            self.last_version = event.version
+            self.published += 1
+            loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                pass  # the loop has closed
+
+    def _wake(self) -> None:
+        waiting = self._next
+        if waiting is not None and not waiting.done():
+            self._next = self._loop.create_future()
+            waiting.set_result(None)
+
+    def _waiter(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._next is None or self._next.done():
+            self._loop = loop
+            self._next = loop.create_future()
+        return self._next
+
+    def since(self, version: int) -> Optional[List[ChangeEvent]]:
+        """Buffered events after `version`, or None when some of them are no
+        longer buffered or `version` is not one this feed has seen"""
+        with self._lock:
+            if version > self.last_version:
+                return None
+            if version == self.last_version:
+                return []
+            if not self._events or self._events[0].version > version + 1:
+                return None
+            missed = []
+            for event in reversed(self._events):
+                if event.version <= version:
+                    break
+                missed.append(event)
+        missed.reverse()
+        return missed
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE frames for one subscriber, resuming after `last_event_id` when
+        given. The stream ends after `max_stream_seconds` and the client
+        reconnects with Last-Event-ID: servers wait for open responses when
+        shutting down, and reconnecting spreads subscribers over new workers."""
+        self.start()
+        self.subscribers += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_stream_seconds
+        try:
+            yield b"retry: %d\n\n" % self.retry_ms
+            if last_event_id is None:
+                version = self.last_version
+                yield control_frame("ready", version)
+            else:
+                version = int(last_event_id) if last_event_id.isdigit() else -1
+            while loop.time() < deadline:
+                waiter = self._waiter()
+                events = self.since(version)
+                if events is None:
+                    self.resyncs += 1
+                    version = self.last_version
+                    yield control_frame("resync", version)
+                    continue
+                if events:
+                    version = events[-1].version
+                    yield b"".join(event.frame() for event in events)
+                    continue
+                done, _ = await asyncio.wait((waiter,), timeout=min(self.keepalive, max(deadline - loop.time(), 0)))
+                if not done and loop.time() < deadline:
+                    # Keeps proxies from closing an idle stream and surfaces dead clients
+                    yield b": keepalive\n\n"
+        finally:
+            self.subscribers -= 1
+
+    def stats(self):
+        return {"published": self.published, "resyncs": self.resyncs}
+
+
+def make_change_broker(kind: str) -> ChangeBroker:
+    if kind == "sqlite":
+        return SQLiteBroker(
+            settings.item_changes_shared_path,
+            poll_interval=settings.item_changes_poll_seconds,
+            retain=max(settings.item_changes_buffer_size * 10, 10000),
+        )
+    return MemoryBroker()
+
+
+# Create/update/delete events of items, published by app.crud.items
+item_changes = ChangeFeed(
+    make_change_broker(settings.item_changes_broker) if settings.item_changes_enabled else MemoryBroker(),
+    capacity=settings.item_changes_buffer_size,
+    keepalive=settings.item_changes_keepalive_seconds,
+    max_stream_seconds=settings.item_changes_max_stream_seconds,
+    retry_ms=settings.item_changes_retry_ms,
+    enabled=settings.item_changes_enabled,
+)
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Callable, ContextManager, Iterable, Iterator, Mapping, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+
+# Rows are encoded into buffers of roughly this size before being sent
+FLUSH_BYTES = 64 * 1024
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _buffered(pieces: Iterable[str]) -> Iterator[bytes]:
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= FLUSH_BYTES:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+def ndjson_chunks(rows: Iterable[Mapping]) -> Iterator[bytes]:
+    """One JSON object per line"""
+    return _buffered(json.dumps(dict(row), default=_json_default) + "\n" for row in rows)
+
+def csv_chunks(rows: Iterable[Mapping], fieldnames: Sequence[str]) -> Iterator[bytes]:
+    """CSV with a header line; datetimes are written in ISO format"""
+    def lines():
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(fieldnames)
+        for row in rows:
+            writer.writerow(
+                row[name].isoformat() if isinstance(row[name], (datetime, date)) else row[name]
+                for name in fieldnames
+            )
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+        yield out.getvalue()
+    return _buffered(lines())
+
+def encode_rows(rows: Iterable[Mapping], fmt: str, fieldnames: Sequence[str]) -> Iterator[bytes]:
+    return csv_chunks(rows, fieldnames) if fmt == "csv" else ndjson_chunks(rows)
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream on the fly into a single gzip member"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_response(
+    iter_rows: Callable[[Session], Iterable[Mapping]],
+    fieldnames: Sequence[str],
+    fmt: str,
+    compress: bool,
+    filename: str,
+    session_scope: Callable[[], ContextManager[Session]] = SessionLocal,
+) -> StreamingResponse:
+    """Stream a table export. The body owns its session (opened with
+    `session_scope`) so the export keeps reading after the request's own
+    dependencies have been torn down."""
+    def body() -> Iterator[bytes]:
+        with session_scope() as db:
+            chunks = encode_rows(iter_rows(db), fmt, fieldnames)
+            yield from gzip_chunks(chunks) if compress else chunks
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,100 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core.serialization import loads
+
+# A resource version: (id, created_at, updated_at) as stored, or as serialized in a payload
+Version = Tuple[int, object, object]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _as_utc(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _stamp(created_at, updated_at) -> datetime:
+    return _as_utc(updated_at) or _as_utc(created_at) or EPOCH
+
+def resource_validators(version: Version) -> Tuple[str, datetime]:
+    """Strong ETag and Last-Modified for a single row"""
+    item_id, created_at, updated_at = version
+    stamp = _stamp(created_at, updated_at)
+    return f'"{item_id}-{(stamp - EPOCH) // timedelta(microseconds=1)}"', stamp
+
+def collection_validators(versions: Iterable[Version], variant: str = "") -> Tuple[str, None]:
+    """ETag for a list page, changing whenever a member is added, removed or
+    modified. Pages get no Last-Modified: removing a member does not move the
+    newest timestamp, so If-Modified-Since could not detect it. `variant` tells
+    apart representations of the same rows, such as sparse fieldsets."""
+    digest = hashlib.sha1(variant.encode())
+    for version in versions:
+        digest.update(resource_validators(version)[0].encode())
+    return f'"c-{digest.hexdigest()}"', None
+
+def payload_version(row: dict) -> Version:
+    return row["id"], row.get("created_at"), row.get("updated_at")
+
+def payload_validators(payload: bytes, collection: bool = False, variant: str = "") -> Tuple[str, Optional[datetime]]:
+    """Validators recomputed from an already-serialized payload"""
+    data = loads(payload)
+    if collection:
+        return collection_validators((payload_version(row) for row in data), variant)
+    return resource_validators(payload_version(data))
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """Compare an If-Match/If-None-Match header against an ETag"""
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110 13.2.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= _as_utc(since)
+    return False
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+def json_response(request: Request, payload: bytes, etag: str, last_modified: Optional[datetime], headers: Optional[dict] = None) -> Response:
+    """Send a serialized payload, or a 304 when the client's copy is current"""
+    if not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return Response(
+        content=payload,
+        media_type="application/json",
+        headers={**(headers or {}), **validator_headers(etag, last_modified)},
+    )
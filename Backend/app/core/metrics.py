@@ -0,0 +1,208 @@
+import bisect
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow bcrypt calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), lock: Optional[threading.Lock] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Metrics updated together can share a lock, see record_request()
+        self._lock = lock or threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), lock: Optional[threading.Lock] = None):
+        super().__init__(name, help, labelnames, lock)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._inc(labels, amount)
+
+    def _inc(self, labels: Labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+
+class Gauge(Metric):
+    """A value read at scrape time from a callback returning {labels: value}"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], collect: Callable[[], Dict[Labels, float]]):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}"
+            for labels, value in sorted(self.collect().items())
+        ]
+
+class CallbackCounter(Gauge):
+    """A monotonically increasing value kept elsewhere, read at scrape time"""
+    kind = "counter"
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS, lock: Optional[threading.Lock] = None,
+    ):
+        super().__init__(name, help, labelnames, lock)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._observe(value, labels)
+
+    def _observe(self, value: float, labels: Labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        lines = []
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = (), lock: Optional[threading.Lock] = None) -> Counter:
+        return self.register(Counter(name, help, labelnames, lock))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS, lock: Optional[threading.Lock] = None,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets, lock))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str], collect: Callable[[], Dict[Labels, float]]) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, collect))
+
+    def callback_counter(self, name: str, help: str, labelnames: Sequence[str], collect: Callable[[], Dict[Labels, float]]) -> CallbackCounter:
+        return self.register(CallbackCounter(name, help, labelnames, collect))
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines += metric.header()
+            lines += metric.samples()
+        return ("\n".join(lines) + "\n").encode()
+
+registry = Registry()
+
+# HTTP (recorded by app.core.middleware.MetricsMiddleware through record_request)
+_http_lock = threading.Lock()
+http_requests = registry.counter(
+    "http_requests_total", "Requests served, by route template and status", ("method", "route", "status"), _http_lock
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body",
+    ("method", "route"), lock=_http_lock,
+)
+db_queries_per_request = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), COUNT_BUCKETS, _http_lock
+)
+db_time_per_request = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request", ("method", "route"), lock=_http_lock
+)
+
+# Database (recorded by engine and pool hooks in app.db.database). The
+# histogram's _count is the number of statements run.
+db_query_duration = registry.histogram("db_query_duration_seconds", "SQL statement execution time", ("engine",))
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",)
+)
+
+# Password hashing (recorded in app.core.security), queueing included
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify time including the wait for a worker", ("operation",)
+)
+
+# Admission control (recorded by app.core.admission.AdmissionMiddleware)
+admission_shed = registry.counter(
+    "admission_shed_total", "Requests turned away with 503, by class and reason (queue_full, timeout)", ("class", "reason")
+)
+admission_queue_wait = registry.histogram(
+    "admission_queue_wait_seconds", "Time requests waited for an admission slot, shed ones included", ("class",)
+)
+
+class RequestStats:
+    """Per-request tallies; the object is shared with the threadpool copies of
+    the request's context, so handlers running in threads add to it too.
+    `scope` lets the slow-query log name the route."""
+
+    __slots__ = ("queries", "query_seconds", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.scope = scope
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def record_request(method: str, route: str, status: int, elapsed: float, stats: RequestStats) -> None:
+    """Update every per-request metric under one lock acquisition"""
+    labels = (method, route)
+    with _http_lock:
+        http_requests._inc((method, route, str(status)))
+        http_request_duration._observe(elapsed, labels)
+        db_queries_per_request._observe(stats.queries, labels)
+        db_time_per_request._observe(stats.query_seconds, labels)
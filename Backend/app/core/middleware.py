@@ -0,0 +1,66 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.db.replicas import STICKY_COOKIE, request_writes
+
+class MetricsMiddleware:
+    """Record request counts, latency and database work per route template
+    (`/items/{item_id}`, not the raw path, to keep label cardinality bounded)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = metrics.RequestStats(scope)
+        token = metrics.request_stats.set(stats)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.request_stats.reset(token)
+            # Set by the router on the shared scope once a route matched
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.record_request(scope["method"], route, status, time.perf_counter() - started, stats)
+
+class ReadYourWritesMiddleware:
+    """After a request that committed a write, set a cookie that routes the
+    client's reads to the primary for `window` seconds, past the time replicas
+    need to catch up"""
+
+    def __init__(self, app: ASGIApp, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = {"committed": False}
+        token = request_writes.set(writes)
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and writes["committed"] and message["status"] < 400:
+                until = int(time.time() + self.window) + 1
+                cookie = f"{STICKY_COOKIE}={until}; Max-Age={int(self.window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            request_writes.reset(token)
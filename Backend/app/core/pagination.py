@@ -0,0 +1,58 @@
+import base64
+import json
+
+from typing import Iterable, List, Tuple
+
+SORT_DIRECTIONS = ("asc", "desc")
+
+def encode_cursor(last_id: int, sort: str = "asc") -> str:
+    """Build an opaque keyset cursor pointing just past `last_id`"""
+    raw = json.dumps({"id": last_id, "sort": sort}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str = "asc") -> int:
+    """Return the last id seen from a cursor, raising ValueError if it is malformed
+    or was issued for the other sort direction"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id, cursor_sort = int(data["id"]), data["sort"]
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if cursor_sort != sort:
+        raise ValueError("Cursor was issued for a different sort order")
+    return last_id
+
+def encode_search_cursor(score: float, last_id: int, q: str) -> str:
+    """Cursor just past (score, last_id) in the results for query `q`"""
+    raw = json.dumps({"score": score, "id": last_id, "q": q}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str, q: str) -> Tuple[float, int]:
+    """Return (score, last id) from a search cursor, raising ValueError if it is
+    malformed or belongs to a different query"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        score, last_id, cursor_q = float(data["score"]), int(data["id"]), data["q"]
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if cursor_q != q:
+        raise ValueError("Cursor was issued for a different search")
+    return score, last_id
+
+def parse_order_by(spec: str, allowed: Iterable[str]) -> List[Tuple[str, bool]]:
+    """Parse "price,-created_at" into [("price", False), ("created_at", True)]
+    (field, descending), raising ValueError for unknown or repeated fields"""
+    allowed = tuple(allowed)
+    fields: List[Tuple[str, bool]] = []
+    for part in spec.split(","):
+        part = part.strip()
+        descending = part.startswith("-")
+        name = part.lstrip("+-")
+        if name not in allowed:
+            raise ValueError(f"Cannot order by {name!r}; choose from {', '.join(allowed)}")
+        if any(name == seen for seen, _ in fields):
+            raise ValueError(f"{name!r} appears more than once in order_by")
+        fields.append((name, descending))
+    return fields
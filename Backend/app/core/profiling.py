@@ -0,0 +1,184 @@
+"""On-demand request profiling.
+
+With PROFILING_ENABLED=true, a request is profiled when it carries a valid
+X-Profile-Token header or is picked by PROFILING_SAMPLE_RATE. The cProfile
+data is written to PROFILING_OUTPUT_DIR as a .prof file (readable by pstats,
+snakeviz, or flameprof/gprof2dot for a flame graph) and the file name is
+returned in an X-Profile-File header.
+
+Works on Python 3.9+. Up to 3.11 a cProfile profiler only sees the thread
+that enabled it, so sync endpoints get a profiler of their own in the
+threadpool thread that runs them. From 3.12 cProfile is built on
+sys.monitoring: one profiler per process, which already sees every thread,
+and a second enable() would raise ValueError.
+
+Print a header value that stays valid for ten minutes:
+
+    python -m app.core.profiling token --ttl 600
+"""
+import argparse
+import cProfile
+import functools
+import hashlib
+import hmac
+import inspect
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.settings import settings
+
+PROFILE_HEADER = b"x-profile-token"
+
+# Python 3.12+: the request's loop profiler also records threadpool threads
+PROFILER_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+def _secret() -> bytes:
+    return (settings.profiling_secret or settings.secret_key).encode()
+
+def sign_profile_token(expires_at: int) -> str:
+    signature = hmac.new(_secret(), str(expires_at).encode(), hashlib.sha256).hexdigest()
+    return f"{expires_at}.{signature}"
+
+def verify_profile_token(token: str, now: Optional[float] = None) -> bool:
+    expires_at = token.partition(".")[0]
+    if not expires_at.isdigit() or int(expires_at) < (now or time.time()):
+        return False
+    return hmac.compare_digest(sign_profile_token(int(expires_at)), token)
+
+class RequestProfile:
+    """cProfile data for one request: the event loop thread plus any
+    threadpool thread that ran the request's sync endpoint or crud calls"""
+
+    def __init__(self):
+        self.loop_profile = cProfile.Profile()
+        self.thread_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        if PROFILER_SEES_ALL_THREADS:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self.thread_profiles.append(profile)
+
+    def dump(self, path: str) -> None:
+        stats = pstats.Stats(self.loop_profile)
+        for profile in self.thread_profiles:
+            stats.add(profile)
+        stats.dump_stats(path)
+
+# The profile of the current request, if it is being profiled
+active_profile: ContextVar[Optional[RequestProfile]] = ContextVar("active_profile", default=None)
+
+def profiled_in_thread(call):
+    """Wrap a sync callable about to run in the threadpool so a profiled
+    request's profile covers it (see RequestProfile.thread)"""
+    @functools.wraps(call)
+    def run(*args, **kwargs):
+        profile = active_profile.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        with profile.thread():
+            return call(*args, **kwargs)
+    return run
+
+def profile_threadpool_endpoints(app: FastAPI) -> None:
+    """cProfile only sees the thread it was enabled in, so sync endpoints,
+    which FastAPI runs in its threadpool, profile themselves there. Not
+    needed from Python 3.12, where one profiler covers every thread."""
+    if PROFILER_SEES_ALL_THREADS:
+        return
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not inspect.iscoroutinefunction(route.dependant.call):
+            route.dependant.call = profiled_in_thread(route.dependant.call)
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_") or "root"
+
+def profile_filename(scope: Scope) -> str:
+    route = getattr(scope.get("route"), "path", scope["path"])
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{_slug(route)}-{uuid.uuid4().hex[:8]}.prof"
+
+class ProfilingMiddleware:
+    """Profiles selected requests. One request is profiled at a time per
+    process; others arriving meanwhile run unprofiled. Coroutines of
+    concurrent requests that run on the event loop during a profiled request
+    show up in its profile too."""
+
+    def __init__(self, app: ASGIApp, output_dir: str, sample_rate: float = 0.0):
+        self.app = app
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self._busy = False
+
+    def _wanted(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return verify_profile_token(value.decode("latin-1"))
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._busy or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        try:
+            profile.loop_profile.enable()
+        except ValueError:
+            # Another profiler (python -m cProfile, a debugger) owns sys.monitoring
+            await self.app(scope, receive, send)
+            return
+        self._busy = True
+        token = active_profile.set(profile)
+        filename = None
+
+        async def send_with_filename(message: Message) -> None:
+            nonlocal filename
+            if message["type"] == "http.response.start":
+                filename = profile_filename(scope)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-file", filename.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_filename)
+        finally:
+            profile.loop_profile.disable()
+            active_profile.reset(token)
+            self._busy = False
+            os.makedirs(self.output_dir, exist_ok=True)
+            await run_in_threadpool(profile.dump, os.path.join(self.output_dir, filename or profile_filename(scope)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Request profiling helpers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    token = commands.add_parser("token", help="print an X-Profile-Token header value")
+    token.add_argument("--ttl", type=int, default=600, help="seconds the token stays valid")
+    args = parser.parse_args()
+    print(sign_profile_token(int(time.time()) + args.ttl))
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,114 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
 from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 
+from app.core import metrics
+from app.core.settings import settings
+
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Hashing executor: bcrypt is CPU bound, so it never runs on the event loop or
+# in Starlette's request threadpool. At most `password_hash_max_pending` hashes
+# may be running or queued; further callers wait up to the queue timeout.
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(settings.password_hash_max_pending)
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def get_hash_executor() -> Executor:
+    """Return the shared hashing executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if settings.password_hash_executor == "thread":
+                    _executor = ThreadPoolExecutor(
+                        max_workers=settings.password_hash_workers,
+                        thread_name_prefix="password-hash",
+                    )
+                else:
+                    _executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+    return _executor
+
+def shutdown_hash_executor() -> None:
+    """Stop the hashing workers (called on application shutdown)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+class HashingBusy(Exception):
+    """No hashing slot freed up within password_hash_queue_timeout_seconds;
+    app.main answers it with 503 and Retry-After"""
+
+def _acquire_slot() -> None:
+    if not _hash_slots.acquire(timeout=settings.password_hash_queue_timeout_seconds):
+        raise HashingBusy("Password hashing is busy, please retry")
+
+async def _acquire_slot_async() -> None:
+    if _hash_slots.acquire(blocking=False):
+        return
+    # Only wait off the event loop when the pool is actually saturated
+    await run_in_threadpool(_acquire_slot)
+
+def _submit(operation: str, started: float, fn, *args) -> Future:
+    try:
+        future = get_hash_executor().submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+
+    def done(_: Future) -> None:
+        _hash_slots.release()
+        # Measured from the call, so time spent waiting for a slot counts too
+        metrics.password_hash_duration.observe(time.perf_counter() - started, operation)
+
+    future.add_done_callback(done)
+    return future
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify a password and return a new hash if the stored one is outdated"""
+    started = time.perf_counter()
+    _acquire_slot()
+    return _submit("verify", started, _verify_and_update, plain_password, hashed_password).result()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    started = time.perf_counter()
+    _acquire_slot()
+    return _submit("hash", started, _hash, password).result()
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Async variant of verify_and_update_password for use inside `async def` handlers"""
+    started = time.perf_counter()
+    await _acquire_slot_async()
+    return await asyncio.wrap_future(_submit("verify", started, _verify_and_update, plain_password, hashed_password))
+
+async def get_password_hash_async(password: str) -> str:
+    """Async variant of get_password_hash for use inside `async def` handlers"""
+    started = time.perf_counter()
+    await _acquire_slot_async()
+    return await asyncio.wrap_future(_submit("hash", started, _hash, password))
@@ -0,0 +1,45 @@
+import json
+from datetime import date, datetime, timezone
+from typing import Any, Iterable, List, Mapping, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # the "fast" extra: pip install -e ".[fast]"
+    orjson = None
+
+def _default(value):
+    if isinstance(value, datetime):
+        # Same layout as pydantic and orjson: "Z" for UTC
+        text = value.isoformat()
+        return text[:-6] + "Z" if value.utcoffset() == timezone.utc.utcoffset(None) else text
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes for plain data (dicts, lists, datetimes), matching
+    what pydantic's model_dump_json() writes for the same values"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+def loads(payload: bytes) -> Any:
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+def parse_fields(spec: str, allowed: Iterable[str]) -> List[str]:
+    """Parse a sparse fieldset such as "id,name,price", raising ValueError
+    for unknown fields; the result follows the order of `allowed`"""
+    allowed = tuple(allowed)
+    requested = {part.strip() for part in spec.split(",") if part.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(sorted(unknown))}; choose from {', '.join(allowed)}")
+    if not requested:
+        raise ValueError("fields must name at least one field")
+    return [name for name in allowed if name in requested]
+
+def field_columns(columns: Mapping[str, Any], fields: Sequence[str], extra: Iterable[Any] = ()) -> Tuple:
+    """The columns behind `fields`, followed by any `extra` ones not among
+    them; zip(fields, row) over the selected rows leaves the extras out"""
+    selected = tuple(columns[name] for name in fields)
+    return selected + tuple(column for column in extra if column.key not in fields)
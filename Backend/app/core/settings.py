@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # App Configuration
@@ -18,16 +18,125 @@ class Settings(BaseSettings):
     cors_allow_credentials: bool = True
     cors_allow_methods: List[str] = ["*"]
     cors_allow_headers: List[str] = ["*"]
+    cors_expose_headers: List[str] = ["X-Next-Cursor", "X-Total-Count", "ETag", "Last-Modified", "Retry-After"]
     
     # Database Configuration
     database_url: str = "sqlite:///./db/fastapi_project.db"
     database_echo: bool = False
+    # Also build an AsyncEngine (aiosqlite/asyncpg); implied by an async driver in database_url
+    database_async: bool = False
+    # Engine tuning profile: "sqlite-wal", "postgres-oltp", "custom" (SQLAlchemy
+    # defaults) or "auto" (picked from the database_url backend). Any db_* value
+    # set below overrides the profile.
+    db_profile: str = "auto"
+    db_pool_size: int | None = None
+    db_max_overflow: int | None = None
+    db_pool_timeout: float | None = None
+    db_pool_recycle: int | None = None
+    db_pool_pre_ping: bool | None = None
+    db_query_cache_size: int | None = None
+    # SQLite PRAGMAs run on every new connection, merged over the profile's
+    db_sqlite_pragmas: Dict[str, str | int] = {}
+
+    # Read Replica Configuration
+    # GET routes read from these; writes always go to database_url
+    database_replica_urls: List[str] = []
+    database_replica_strategy: str = "round_robin"  # "round_robin" or "least_loaded"
+    # After a write, keep routing that client's reads to the primary for this long
+    database_read_after_write_seconds: float = 5.0
+    database_replica_health_interval_seconds: float = 10.0
+
+    # Item Cache Configuration
+    # "memory" is per process; "sqlite" is shared by all workers on the host
+    item_cache_enabled: bool = False
+    item_cache_backend: str = "memory"
+    item_cache_ttl_seconds: float = 30.0
+    item_cache_max_entries: int = 10000
+    item_cache_max_bytes: int = 16 * 1024 * 1024
+    item_cache_shared_path: str = "./db/item_cache.sqlite3"
+
+    # Item Change Feed Configuration (GET /items/changes)
+    # "memory" serves one worker; "sqlite" shares events between all workers on the host
+    item_changes_enabled: bool = True
+    item_changes_broker: str = "memory"
+    item_changes_buffer_size: int = 1000
+    item_changes_keepalive_seconds: float = 15.0
+    # Streams end after this long and clients resume with Last-Event-ID, so
+    # open streams never hold up a graceful shutdown for longer
+    item_changes_max_stream_seconds: float = 300.0
+    # Reconnection delay suggested to EventSource clients
+    item_changes_retry_ms: int = 3000
+    item_changes_shared_path: str = "./db/item_changes.sqlite3"
+    item_changes_poll_seconds: float = 0.5
+
+    # Bulk Write Configuration
+    bulk_max_batch_size: int = 10000
+    bulk_chunk_size: int = 500
+    lookup_max_ids: int = 1000
+    export_batch_size: int = 1000
+    import_batch_size: int = 1000
+    # Parsed-line buffers queued between an upload and the import thread
+    import_queue_chunks: int = 16
     
     # Authentication Configuration
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
-    
+    # Trust the id/is_active/version claims in the token instead of loading the user
+    auth_stateless_tokens: bool = False
+    principal_cache_size: int = 1024
+    principal_cache_ttl_seconds: float = 60.0
+
+    # Password Hashing Configuration
+    # Changing the cost factor rehashes each password on its owner's next login
+    bcrypt_rounds: int = 12
+    password_hash_executor: str = "process"  # "process" or "thread"
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+    password_hash_queue_timeout_seconds: float = 5.0
+
+    # Admission Control Configuration
+    # Per-worker budgets for cheap reads, database writes and the bcrypt-bound
+    # auth paths: requests past the limit wait in a queue of the given size
+    # for at most the timeout, and the rest get 503 with Retry-After at once.
+    # A worker runs Python on one core, so small read limits keep latency
+    # flat; raise them when requests mostly wait on a remote database. Off by
+    # default: size the budgets for the deployment (the read and write limits
+    # together should not exceed db_pool_size + db_max_overflow) before
+    # turning it on.
+    admission_control_enabled: bool = False
+    admission_read_limit: int = 4
+    admission_read_queue: int = 8
+    admission_read_timeout_seconds: float = 0.1
+    admission_write_limit: int = 4
+    admission_write_queue: int = 16
+    admission_write_timeout_seconds: float = 0.5
+    admission_auth_limit: int = 4
+    admission_auth_queue: int = 8
+    admission_auth_timeout_seconds: float = 1.0
+    admission_retry_after_seconds: int = 1
+    admission_auth_paths: List[str] = ["/token", "/register"]
+    # Long-lived streams (the change feed, exports and imports) and the
+    # metrics scrape bypass admission control
+    admission_exempt_paths: List[str] = ["/metrics", "/items/changes", "/items/export", "/users/export", "/items/import"]
+
+    # Metrics Configuration
+    # Serve /metrics (Prometheus text format) and record request, query and pool
+    # timings. Off by default: the endpoint is unauthenticated, so expose it
+    # only where the scraper, not the public, can reach it.
+    metrics_enabled: bool = False
+
+    # Profiling Configuration
+    # Profile a request that carries a valid X-Profile-Token header (see
+    # `python -m app.core.profiling token`), or a random share of all requests
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0
+    # Key for X-Profile-Token signatures; secret_key when empty
+    profiling_secret: str = ""
+    profiling_output_dir: str = "./profiles"
+    # Log statements slower than this (milliseconds); None turns the log off
+    slow_query_threshold_ms: float | None = None
+
     model_config = {"env_file": ".env"}
 
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,134 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Dict, List, Mapping, Optional, Sequence, Tuple
+from app.models import items as models
+from app.schemas import items as schemas
+from app.core.cache import item_cache
+from app.core.serialization import dumps, field_columns, loads
+from app.db.database import supports_returning
+from app.crud import items as crud
+from app.crud.items import (
+    EXPORT_COLUMNS, ITEM_COLUMNS, VERSION_COLUMNS, BulkOutcome, OrderBy, StaleItemError,
+    item_created, item_deleted, item_updated, items_page_query,
+)
+
+# Async twins of app.crud.items for AsyncSession, called through
+# app.crud.dispatch.run_crud when DATABASE_ASYNC is on. Statements, payload
+# encoding and the post-write cache invalidation and change-feed events all
+# come from app.crud.items. The rarely used paths (bulk writes, stats upkeep
+# and databases without RETURNING) run the sync functions with
+# AsyncSession.run_sync, still over the async driver.
+async def get_item(db: AsyncSession, item_id: int) -> Optional[models.Item]:
+    return await db.get(models.Item, item_id)
+
+async def get_items(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", filters: Optional[schemas.ItemFilters] = None, order_by: OrderBy = ()) -> List[models.Item]:
+    return list(await db.scalars(items_page_query(skip, limit, after_id, sort, filters=filters, order_by=order_by)))
+
+async def get_item_stats(db: AsyncSession) -> schemas.ItemStats:
+    return crud.item_stats_from_row((await db.execute(crud.item_stats_query())).one())
+
+async def count_items(db: AsyncSession, filters: Optional[schemas.ItemFilters] = None) -> Optional[int]:
+    if not crud.stats_can_count(filters):
+        return None
+    return crud.count_from_stats(await get_item_stats(db), filters)
+
+async def check_item_stats(db: AsyncSession) -> Dict[str, Tuple]:
+    return await db.run_sync(crud.check_item_stats)
+
+async def rebuild_item_stats(db: AsyncSession) -> None:
+    await db.run_sync(crud.rebuild_item_stats)
+
+async def search_items(db: AsyncSession, q: str, limit: int = 20, after: Optional[Tuple[float, int]] = None, prefix: bool = True) -> List[Tuple[int, float]]:
+    search = crud.search_statement(db.get_bind().dialect.name, q, limit, after, prefix)
+    if search is None:
+        return []
+    return [(row.id, row.score) for row in await db.execute(*search)]
+
+async def get_item_version(db: AsyncSession, item_id: int) -> Optional[Tuple]:
+    row = (await db.execute(select(*VERSION_COLUMNS).where(models.Item.id == item_id))).first()
+    return None if row is None else tuple(row)
+
+async def get_items_versions(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", filters: Optional[schemas.ItemFilters] = None, order_by: OrderBy = ()) -> List[Tuple]:
+    stmt = items_page_query(skip, limit, after_id, sort, columns=VERSION_COLUMNS, filters=filters, order_by=order_by)
+    return [tuple(row) for row in await db.execute(stmt)]
+
+async def iter_item_rows(db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[Mapping]:
+    async for row in await db.stream(crud.export_query(batch_size)):
+        yield row._mapping
+
+async def get_item_payload(db: AsyncSession, item_id: int) -> Optional[bytes]:
+    async def load():
+        return crud.row_payload((await db.execute(crud.item_payload_query(item_id))).first())
+    return await item_cache.get_or_load_async(f"item:{item_id}", load)
+
+async def get_item_payloads(db: AsyncSession, item_ids: List[int], chunk_size: int = 500) -> Dict[int, bytes]:
+    version, payloads, missing = crud.cached_item_payloads(item_ids)
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        rows = await db.execute(select(*EXPORT_COLUMNS).where(models.Item.id.in_(chunk)))
+        crud.add_loaded_payloads(db, payloads, rows, version)
+    return payloads
+
+async def get_items_payload(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", filters: Optional[schemas.ItemFilters] = None, order_by: OrderBy = ()) -> Tuple[bytes, List[int]]:
+    async def page_rows():
+        stmt = items_page_query(skip, limit, after_id, sort, columns=EXPORT_COLUMNS, filters=filters, order_by=order_by)
+        return (await db.execute(stmt)).all()
+
+    if not item_cache.enabled:
+        rows = await page_rows()
+        return dumps([crud.item_record(row) for row in rows]), [row.id for row in rows]
+
+    version = item_cache.version
+    async def load_ids():
+        return crud.page_ids(db, await page_rows(), version)
+    list_key = crud.items_list_key(version, skip, limit, after_id, sort, filters, order_by)
+    item_ids = loads(await item_cache.get_or_load_async(list_key, load_ids))
+    return crud.page_payload(item_ids, await get_item_payloads(db, item_ids))
+
+async def get_items_fields_payload(db: AsyncSession, fields: Sequence[str], skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", filters: Optional[schemas.ItemFilters] = None, order_by: OrderBy = ()) -> Tuple[bytes, List[Tuple]]:
+    columns = field_columns(ITEM_COLUMNS, fields, VERSION_COLUMNS)
+    stmt = items_page_query(skip, limit, after_id, sort, columns=columns, filters=filters, order_by=order_by)
+    return crud.fields_payload(fields, (await db.execute(stmt)).all())
+
+# Writes: the sessions are built with expire_on_commit=False, so the rows
+# RETURNING loaded stay readable after the commit without a refresh
+async def create_item(db: AsyncSession, item: schemas.ItemCreate) -> models.Item:
+    if not supports_returning(db, "insert"):
+        return await db.run_sync(crud.create_item, item)
+    db_item = (await db.scalars(crud.item_insert_statement(item))).one()
+    await db.commit()
+    return item_created(db_item)
+
+async def update_item(db: AsyncSession, item_id: int, item: schemas.ItemUpdate, expected_version: Optional[Tuple] = None) -> Optional[models.Item]:
+    update_data = item.model_dump(exclude_unset=True)
+    if not update_data:
+        return await get_item(db, item_id)
+    if not supports_returning(db, "update"):
+        return await db.run_sync(crud._update_item_fetched, item_id, update_data, expected_version)
+    db_item = (await db.scalars(crud.item_update_statement(item_id, update_data, expected_version))).one_or_none()
+    if db_item is None:
+        await db.rollback()
+        if expected_version is not None and await get_item_version(db, item_id) is not None:
+            raise StaleItemError(item_id)
+        return None
+    await db.commit()
+    return item_updated(db_item)
+
+async def delete_item(db: AsyncSession, item_id: int) -> Optional[models.Item]:
+    if not supports_returning(db, "delete"):
+        return await db.run_sync(crud.delete_item, item_id)
+    db_item = (await db.scalars(crud.item_delete_statement(item_id))).one_or_none()
+    if db_item is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    return item_deleted(item_id, db_item)
+
+async def bulk_create_items(db: AsyncSession, items: List[schemas.ItemCreate], atomic: bool = True, chunk_size: int = 500) -> List[BulkOutcome]:
+    return await db.run_sync(crud.bulk_create_items, items, atomic, chunk_size)
+
+async def bulk_update_items(db: AsyncSession, items: List[schemas.ItemBulkUpdate], atomic: bool = True, chunk_size: int = 500) -> List[BulkOutcome]:
+    return await db.run_sync(crud.bulk_update_items, items, atomic, chunk_size)
+
+async def bulk_delete_items(db: AsyncSession, item_ids: List[int], atomic: bool = True, chunk_size: int = 500) -> List[BulkOutcome]:
+    return await db.run_sync(crud.bulk_delete_items, item_ids, atomic, chunk_size)
@@ -0,0 +1,100 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Dict, List, Mapping, Optional, Sequence, Tuple
+from app.models import users as models
+from app.schemas import users as schemas
+from app.core.security import get_password_hash_async
+from app.db.database import supports_returning
+from app.crud import users as crud
+from app.crud.users import USER_COLUMNS, VERSION_COLUMNS, evict_principal, forget_user, users_page_query
+from app.core.serialization import field_columns
+
+# Async twins of app.crud.users for AsyncSession, called through
+# app.crud.dispatch.run_crud when DATABASE_ASYNC is on. Passwords are hashed
+# off the event loop, and every write evicts the cached principal and token
+# version with the same helpers as the sync path. Databases without
+# RETURNING run the sync fallbacks with AsyncSession.run_sync.
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    return await db.scalar(select(models.User).where(models.User.id == user_id))
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[models.User]:
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
+async def get_token_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    return await db.scalar(select(models.User.token_version).where(models.User.id == user_id))
+
+async def get_users_by_ids(db: AsyncSession, user_ids: List[int], chunk_size: int = 500) -> Dict[int, models.User]:
+    unique_ids = list(dict.fromkeys(user_ids))
+    users = {}
+    for start in range(0, len(unique_ids), chunk_size):
+        chunk = unique_ids[start:start + chunk_size]
+        users.update((user.id, user) for user in await db.scalars(select(models.User).where(models.User.id.in_(chunk))))
+    return users
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc") -> List[models.User]:
+    return list(await db.scalars(users_page_query(skip, limit, after_id, sort)))
+
+async def get_user_version(db: AsyncSession, user_id: int) -> Optional[Tuple]:
+    row = (await db.execute(select(*VERSION_COLUMNS).where(models.User.id == user_id))).first()
+    return None if row is None else tuple(row)
+
+async def get_users_versions(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc") -> List[Tuple]:
+    return [tuple(row) for row in await db.execute(users_page_query(skip, limit, after_id, sort, columns=VERSION_COLUMNS))]
+
+async def get_users_payload(db: AsyncSession, fields: Optional[Sequence[str]] = None, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc") -> Tuple[bytes, List[Tuple]]:
+    fields = list(fields or USER_COLUMNS)
+    columns = field_columns(USER_COLUMNS, fields, VERSION_COLUMNS)
+    return crud.fields_payload(fields, (await db.execute(users_page_query(skip, limit, after_id, sort, columns=columns))).all())
+
+async def iter_user_rows(db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[Mapping]:
+    async for row in await db.stream(crud.export_query(batch_size)):
+        yield row._mapping
+
+# Writes: the sessions are built with expire_on_commit=False, so the rows
+# RETURNING loaded stay readable after the commit without a refresh
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
+    values = crud.user_values(user, await get_password_hash_async(user.password))
+    if not supports_returning(db, "insert"):
+        db_user = models.User(**values)
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+    db_user = (await db.scalars(crud.user_insert_statement(values))).one()
+    await db.commit()
+    return db_user
+
+async def update_user(db: AsyncSession, user_id: int, user: schemas.UserUpdate) -> Optional[models.User]:
+    update_data = user.model_dump(exclude_unset=True)
+    if "password" in update_data:
+        update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
+    if not update_data:
+        return await get_user(db, user_id)
+    if not supports_returning(db, "update"):
+        return await db.run_sync(crud._update_user_fetched, user_id, update_data)
+    db_user = (await db.scalars(crud.user_update_statement(user_id, update_data))).one_or_none()
+    if db_user is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    evict_principal(user_id, update_data, db_user.username)
+    return db_user
+
+async def rehash_user_password(db: AsyncSession, user_id: int, hashed_password: str) -> None:
+    """Store a fresh hash of the same password; existing tokens stay valid"""
+    await db.execute(crud.rehash_statement(user_id, hashed_password))
+    await db.commit()
+
+async def delete_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    if not supports_returning(db, "delete"):
+        return await db.run_sync(crud.delete_user, user_id)
+    db_user = (await db.scalars(crud.user_delete_statement(user_id))).one_or_none()
+    if db_user is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    forget_user(user_id, db_user.username)
+    return db_user
@@ -0,0 +1,36 @@
+import importlib
+from types import ModuleType
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.profiling import profiled_in_thread
+from app.db.database import AsyncSessionLocal, get_async_db, get_db
+from app.db.replicas import get_read_db
+
+# Session dependencies for routes that call crud through run_crud: an
+# AsyncSession when DATABASE_ASYNC is on, otherwise the sync session (for
+# reads, a replica when configured; the async path always reads the primary)
+if AsyncSessionLocal is not None:
+    get_crud_db = get_crud_read_db = get_async_db
+else:
+    get_crud_db = get_db
+    get_crud_read_db = get_read_db
+
+async def run_crud(module: ModuleType, db, name: str, **kwargs):
+    """Call `name` from a crud module such as app.crud.items with a session from
+    get_crud_db. With DATABASE_ASYNC on, its twin in app.crud.async_<module>
+    runs natively on the AsyncSession; otherwise the sync function runs in the
+    threadpool so the event loop never blocks."""
+    if AsyncSessionLocal is None:
+        return await run_in_threadpool(profiled_in_thread(getattr(module, name)), db, **kwargs)
+    # Imported here: sqlalchemy.ext.asyncio needs the optional greenlet package
+    package, _, base = module.__name__.rpartition(".")
+    twin = importlib.import_module(f"{package}.async_{base}")
+    return await getattr(twin, name)(db, **kwargs)
+
+async def rollback(db) -> None:
+    """Roll back a session from get_crud_db, e.g. after a crud call raised"""
+    if AsyncSessionLocal is None:
+        await run_in_threadpool(db.rollback)
+    else:
+        await db.rollback()
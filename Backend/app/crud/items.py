@@ -1,35 +1,588 @@
+import math
+import re
+from sqlalchemy import Select, bindparam, case, delete, func, insert, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.types import Float, Integer
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 from app.models import items as  models
 from app.schemas import items as schemas
+from app.core.cache import item_cache
+from app.core.changes import item_changes
+from app.core.serialization import dumps, field_columns, loads
+from app.db.database import commit_returning, supports_returning, utcnow
+
+class StaleItemError(Exception):
+    """The item changed after the version an update was based on"""
+
+class BulkAbortedError(Exception):
+    """An all-or-nothing bulk operation hit a failing row and was rolled back"""
+
+    def __init__(self, outcomes: List["BulkOutcome"]):
+        super().__init__("Bulk operation rolled back")
+        self.outcomes = outcomes
+
+# Per-row bulk result: (item id, status, error message)
+BulkOutcome = Tuple[Optional[int], str, Optional[str]]
 
 # Item CRUD operations
 def get_item(db: Session, item_id: int) -> Optional[models.Item]:
     return db.query(models.Item).filter(models.Item.id == item_id).first()
 
-def get_items(db: Session, skip: int = 0, limit: int = 100) -> List[models.Item]:
-    return db.query(models.Item).offset(skip).limit(limit).all()
+# Columns that listings can be ordered by (see app.core.pagination.parse_order_by)
+ORDER_COLUMNS = {
+    "id": models.Item.id,
+    "name": models.Item.name,
+    "price": models.Item.price,
+    "created_at": models.Item.created_at,
+    "updated_at": models.Item.updated_at,
+}
 
-def create_item(db: Session, item: schemas.ItemCreate) -> models.Item:
-    db_item = models.Item(**item.model_dump())
-    db.add(db_item)
+# (field, descending) pairs
+OrderBy = Sequence[Tuple[str, bool]]
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with `prefix`"""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+def item_filter_clauses(filters: Optional[schemas.ItemFilters]) -> List:
+    """WHERE clauses for the set filters. The name prefix is a half-open range
+    rather than LIKE so it can use the name index on every backend."""
+    if filters is None:
+        return []
+    clauses = []
+    if filters.min_price is not None:
+        clauses.append(models.Item.price >= filters.min_price)
+    if filters.max_price is not None:
+        clauses.append(models.Item.price <= filters.max_price)
+    if filters.is_available is not None:
+        clauses.append(models.Item.is_available == filters.is_available)
+    if filters.name_prefix:
+        clauses.append(models.Item.name >= filters.name_prefix)
+        upper = _prefix_upper_bound(filters.name_prefix)
+        if upper is not None:
+            clauses.append(models.Item.name < upper)
+    if filters.created_after is not None:
+        clauses.append(models.Item.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        clauses.append(models.Item.created_at < filters.created_before)
+    if filters.updated_after is not None:
+        clauses.append(models.Item.updated_at >= filters.updated_after)
+    if filters.updated_before is not None:
+        clauses.append(models.Item.updated_at < filters.updated_before)
+    return clauses
+
+def items_page_query(
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    sort: str = "asc",
+    columns: Sequence = (),
+    filters: Optional[schemas.ItemFilters] = None,
+    order_by: OrderBy = (),
+) -> Select:
+    """Page of filtered items ordered by id, or by `order_by` with id as the
+    tie-breaker; `after_id` switches from OFFSET to keyset paging and only
+    applies to the id ordering. Selects whole rows unless `columns` are given."""
+    if after_id is not None and order_by:
+        raise ValueError("Keyset paging is only available when ordering by id")
+    stmt = select(*columns) if columns else select(models.Item)
+    stmt = stmt.where(*item_filter_clauses(filters))
+    for name, descending in order_by:
+        column = ORDER_COLUMNS[name]
+        stmt = stmt.order_by(column.desc() if descending else column)
+    if sort == "desc":
+        stmt = stmt.order_by(models.Item.id.desc())
+        if after_id is not None:
+            stmt = stmt.where(models.Item.id < after_id)
+    else:
+        stmt = stmt.order_by(models.Item.id)
+        if after_id is not None:
+            stmt = stmt.where(models.Item.id > after_id)
+    if after_id is None:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+def get_items(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", filters: Optional[schemas.ItemFilters] = None, order_by: OrderBy = ()) -> List[models.Item]:
+    return list(db.scalars(items_page_query(skip, limit, after_id, sort, filters=filters, order_by=order_by)))
+
+# Stats: read from the item_stats shards that triggers keep up to date (see
+# app.models.items.STATS_DDL), plus the two ends of the price index, so the cost
+# does not grow with the table
+def _stats_totals() -> List:
+    stats = models.item_stats
+    return [func.coalesce(func.sum(stats.c[name]), 0) for name in ("item_count", "available_count", "price_sum")]
+
+def item_stats_query() -> Select:
+    return select(
+        *_stats_totals(),
+        # Separate subqueries: SQLite only reads MIN/MAX off an index when it is the query's only aggregate
+        select(func.min(models.Item.price)).scalar_subquery(),
+        select(func.max(models.Item.price)).scalar_subquery(),
+    ).select_from(models.item_stats)
+
+def item_stats_from_row(row) -> schemas.ItemStats:
+    count, available, price_sum, min_price, max_price = row
+    return schemas.ItemStats(
+        count=count,
+        available_count=available,
+        min_price=min_price,
+        max_price=max_price,
+        avg_price=price_sum / count if count else None,
+    )
+
+def get_item_stats(db: Session) -> schemas.ItemStats:
+    return item_stats_from_row(db.execute(item_stats_query()).one())
+
+def stats_can_count(filters: Optional[schemas.ItemFilters]) -> bool:
+    """Whether the stats know how many items match, which is with no filter or is_available alone"""
+    return filters is None or not filters.model_dump(exclude_none=True, exclude={"is_available"})
+
+def count_from_stats(stats: schemas.ItemStats, filters: Optional[schemas.ItemFilters]) -> int:
+    is_available = filters.is_available if filters is not None else None
+    if is_available is None:
+        return stats.count
+    return stats.available_count if is_available else stats.count - stats.available_count
+
+def count_items(db: Session, filters: Optional[schemas.ItemFilters] = None) -> Optional[int]:
+    """Number of items matching `filters` when the stats can tell; None otherwise"""
+    if not stats_can_count(filters):
+        return None
+    return count_from_stats(get_item_stats(db), filters)
+
+def check_item_stats(db: Session) -> Dict[str, Tuple]:
+    """Compare the stats with a full aggregate over items; returns
+    {field: (kept, actual)} for each total that differs. Reads the whole table."""
+    recorded = db.execute(select(*_stats_totals()).select_from(models.item_stats)).one()
+    actual = db.execute(select(
+        func.count(),
+        func.coalesce(func.sum(case((models.Item.is_available, 1), else_=0)), 0),
+        func.coalesce(func.sum(models.Item.price), 0),
+    ).select_from(models.Item)).one()
+    return {
+        name: (kept, real)
+        for name, kept, real in zip(("count", "available_count", "price_sum"), recorded, actual)
+        if not math.isclose(kept, real, rel_tol=1e-9, abs_tol=1e-6)
+    }
+
+def rebuild_item_stats(db: Session) -> None:
+    """Recompute the stats from items, e.g. after check_item_stats found drift
+    (float rounding in price_sum) or a load that ran with the triggers off"""
+    for statement in models.STATS_REBUILD:
+        db.execute(text(statement))
     db.commit()
-    db.refresh(db_item)
+
+# Full-text search. Scores are normalized so that lower is better on every
+# backend, which lets one (score, id) keyset cursor page through results.
+SEARCH_SQL = {
+    "sqlite": (
+        "SELECT id, score FROM ("
+        " SELECT rowid AS id, bm25(items_fts, 10.0, 1.0) AS score"
+        " FROM items_fts WHERE items_fts MATCH :query"
+        ") WHERE :after_id IS NULL OR score > :after_score OR (score = :after_score AND id > :after_id)"
+        " ORDER BY score, id LIMIT :limit"
+    ),
+    "postgresql": (
+        "SELECT id, score FROM ("
+        " SELECT id, -ts_rank_cd({vector}, to_tsquery('simple', :query)) AS score"
+        " FROM items WHERE {vector} @@ to_tsquery('simple', :query)"
+        ") AS matches WHERE CAST(:after_id AS INTEGER) IS NULL OR score > :after_score"
+        " OR (score = :after_score AND id > :after_id)"
+        " ORDER BY score, id LIMIT :limit"
+    ).format(vector=models.SEARCH_VECTOR_PG),
+}
+
+def search_terms(q: str) -> List[str]:
+    return re.findall(r"\w+", q.lower())
+
+def _search_query(dialect: str, terms: List[str], prefix: bool) -> str:
+    """Every term must match; with `prefix` each one also matches longer words"""
+    if dialect == "sqlite":
+        return " AND ".join(f'"{term}"' + ("*" if prefix else "") for term in terms)
+    return " & ".join(term + (":*" if prefix else "") for term in terms)
+
+def search_statement(dialect: str, q: str, limit: int, after: Optional[Tuple[float, int]], prefix: bool) -> Optional[Tuple]:
+    """The search query and its parameters, or None when `q` has no words.
+    Raises NotImplementedError on backends without a search index."""
+    if dialect not in SEARCH_SQL:
+        raise NotImplementedError(f"Full-text search is not available on {dialect}")
+    terms = search_terms(q)
+    if not terms:
+        return None
+    after_score, after_id = after if after is not None else (None, None)
+    stmt = text(SEARCH_SQL[dialect]).bindparams(
+        bindparam("after_score", type_=Float),
+        bindparam("after_id", type_=Integer),
+    )
+    return stmt, {
+        "query": _search_query(dialect, terms, prefix),
+        "after_score": after_score,
+        "after_id": after_id,
+        "limit": limit,
+    }
+
+def search_items(
+    db: Session,
+    q: str,
+    limit: int = 20,
+    after: Optional[Tuple[float, int]] = None,
+    prefix: bool = True,
+) -> List[Tuple[int, float]]:
+    """(id, score) of the best matches for `q`, best first, starting after the
+    (score, id) of the previous page"""
+    search = search_statement(db.get_bind().dialect.name, q, limit, after, prefix)
+    if search is None:
+        return []
+    return [(row.id, row.score) for row in db.execute(*search)]
+
+# Versions: (id, created_at, updated_at) tuples for HTTP validators, without loading whole rows
+VERSION_COLUMNS = (models.Item.id, models.Item.created_at, models.Item.updated_at)
+
+def get_item_version(db: Session, item_id: int) -> Optional[Tuple]:
+    row = db.execute(select(*VERSION_COLUMNS).where(models.Item.id == item_id)).first()
+    return None if row is None else tuple(row)
+
+def get_items_versions(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", filters: Optional[schemas.ItemFilters] = None, order_by: OrderBy = ()) -> List[Tuple]:
+    stmt = items_page_query(skip, limit, after_id, sort, columns=VERSION_COLUMNS, filters=filters, order_by=order_by)
+    return [tuple(row) for row in db.execute(stmt)]
+
+# Columns behind each schemas.Item field; listings select these rather than
+# whole ORM entities
+ITEM_COLUMNS = {name: getattr(models.Item, name) for name in schemas.Item.model_fields}
+
+# Streaming reads: plain row mappings fetched `batch_size` at a time through a
+# server-side cursor where the driver supports one, so memory stays flat
+EXPORT_COLUMNS = tuple(ITEM_COLUMNS.values())
+
+def export_query(batch_size: int) -> Select:
+    return select(*EXPORT_COLUMNS).order_by(models.Item.id).execution_options(yield_per=batch_size)
+
+def iter_item_rows(db: Session, batch_size: int = 1000) -> Iterator[Mapping]:
+    for row in db.execute(export_query(batch_size)):
+        yield row._mapping
+
+# Cached reads: payloads are serialized schemas.Item JSON, ready to send.
+# Rows read from a replica may lag behind the primary, so they are served but
+# never stored: a stale row must not outlive the invalidation that preceded it.
+def _fills_cache(db: Session) -> bool:
+    return not db.info.get("replica")
+
+def item_json(db_item: models.Item) -> bytes:
+    # Validated once: SQLite's RETURNING hands back 2 rather than 2.0 for a
+    # whole-number REAL, where a SELECT of the same row gives a float
+    return schemas.Item.model_validate(db_item).model_dump_json().encode()
+
+def item_record(row) -> dict:
+    """A row of EXPORT_COLUMNS as a schemas.Item-shaped dict. Rows come from
+    our own table, so re-validating them through schemas.Item would only
+    repeat what the column types guarantee."""
+    return dict(zip(ITEM_COLUMNS, row))
+
+def json_array(payloads: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(payloads) + b"]"
+
+def peek_item_payload(item_id: int) -> Optional[bytes]:
+    """Cached payload for an item, without falling back to the database"""
+    return item_cache.get(f"item:{item_id}")
+
+def item_payload_query(item_id: int) -> Select:
+    return select(*EXPORT_COLUMNS).where(models.Item.id == item_id)
+
+def row_payload(row) -> Optional[bytes]:
+    return None if row is None else dumps(item_record(row))
+
+def get_item_payload(db: Session, item_id: int) -> Optional[bytes]:
+    def load():
+        return row_payload(db.execute(item_payload_query(item_id)).first())
+    return item_cache.get_or_load(f"item:{item_id}", load, store=_fills_cache(db))
+
+def cached_item_payloads(item_ids: List[int]) -> Tuple[int, Dict[int, bytes], List[int]]:
+    """The cache version, the payloads the cache holds for `item_ids` and the
+    distinct ids it is missing"""
+    version = item_cache.version
+    cached = item_cache.get_many(f"item:{item_id}" for item_id in item_ids)
+    payloads = {item_id: cached[f"item:{item_id}"] for item_id in item_ids if f"item:{item_id}" in cached}
+    missing = list(dict.fromkeys(item_id for item_id in item_ids if item_id not in payloads))
+    return version, payloads, missing
+
+def add_loaded_payloads(db: Session, payloads: Dict[int, bytes], rows, version: int) -> None:
+    for row in rows:
+        payloads[row.id] = dumps(item_record(row))
+        if _fills_cache(db):
+            item_cache.set(f"item:{row.id}", payloads[row.id], version)
+
+def get_item_payloads(db: Session, item_ids: List[int], chunk_size: int = 500) -> Dict[int, bytes]:
+    """Payloads for the given ids from the cache, loading the misses with one
+    IN (...) query per `chunk_size` ids. Ids that do not exist are left out."""
+    version, payloads, missing = cached_item_payloads(item_ids)
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        add_loaded_payloads(db, payloads, db.execute(select(*EXPORT_COLUMNS).where(models.Item.id.in_(chunk))), version)
+    return payloads
+
+def get_items_payload(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", filters: Optional[schemas.ItemFilters] = None, order_by: OrderBy = ()) -> Tuple[bytes, List[int]]:
+    """A serialized page of items and its ids. The page's id list is cached under
+    the current cache version and the items themselves under their own keys."""
+    def page_rows():
+        stmt = items_page_query(skip, limit, after_id, sort, columns=EXPORT_COLUMNS, filters=filters, order_by=order_by)
+        return db.execute(stmt).all()
+
+    if not item_cache.enabled:
+        rows = page_rows()
+        return dumps([item_record(row) for row in rows]), [row.id for row in rows]
+
+    version = item_cache.version
+    def load_ids():
+        return page_ids(db, page_rows(), version)
+    list_key = items_list_key(version, skip, limit, after_id, sort, filters, order_by)
+    item_ids = loads(item_cache.get_or_load(list_key, load_ids, store=_fills_cache(db)))
+    return page_payload(item_ids, get_item_payloads(db, item_ids))
+
+def items_list_key(version: int, skip: int, limit: int, after_id: Optional[int], sort: str, filters: Optional[schemas.ItemFilters], order_by: OrderBy) -> str:
+    """Cache key of a page's id list; bumping the cache version retires every one"""
+    query_key = filters.model_dump_json(exclude_none=True) if filters is not None else "{}"
+    order_key = ",".join(f"-{name}" if descending else name for name, descending in order_by)
+    return f"list:{version}:{skip}:{limit}:{after_id}:{sort}:{order_key}:{query_key}"
+
+def page_ids(db: Session, rows, version: int) -> bytes:
+    """Cache a loaded page's items under their own keys and return its serialized id list"""
+    if _fills_cache(db):
+        for row in rows:
+            item_cache.set(f"item:{row.id}", dumps(item_record(row)), version)
+    return dumps([row.id for row in rows])
+
+def page_payload(item_ids: List[int], payloads: Dict[int, bytes]) -> Tuple[bytes, List[int]]:
+    item_ids = [item_id for item_id in item_ids if item_id in payloads]
+    return json_array(payloads[item_id] for item_id in item_ids), item_ids
+
+def get_items_fields_payload(db: Session, fields: Sequence[str], skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", filters: Optional[schemas.ItemFilters] = None, order_by: OrderBy = ()) -> Tuple[bytes, List[Tuple]]:
+    """A page with only `fields` of each item (a sparse fieldset) and the
+    page's versions. Selects just those columns plus the version ones, and
+    bypasses the item cache, which holds whole items."""
+    columns = field_columns(ITEM_COLUMNS, fields, VERSION_COLUMNS)
+    stmt = items_page_query(skip, limit, after_id, sort, columns=columns, filters=filters, order_by=order_by)
+    return fields_payload(fields, db.execute(stmt).all())
+
+def fields_payload(fields: Sequence[str], rows) -> Tuple[bytes, List[Tuple]]:
+    payload = dumps([dict(zip(fields, row)) for row in rows])
+    return payload, [(row.id, row.created_at, row.updated_at) for row in rows]
+
+# Writes are single INSERT/UPDATE/DELETE ... RETURNING statements; databases
+# without RETURNING fall back to load, modify, commit and refresh
+def item_insert_statement(item: schemas.ItemCreate):
+    return insert(models.Item).values(**item.model_dump()).returning(models.Item)
+
+def create_item(db: Session, item: schemas.ItemCreate) -> models.Item:
+    if supports_returning(db, "insert"):
+        db_item = commit_returning(db, db.scalars(item_insert_statement(item)).one())
+    else:
+        db_item = models.Item(**item.model_dump())
+        db.add(db_item)
+        db.commit()
+        db.refresh(db_item)
+    return item_created(db_item)
+
+# After a committed write: drop what the cache holds for the item and tell the
+# change feed. Shared with app.crud.async_items.
+def item_created(db_item: models.Item) -> models.Item:
+    # A new row can belong on any cached page
+    item_cache.invalidate()
+    item_changes.publish([("created", db_item.id, item_json(db_item))])
     return db_item
 
-def update_item(db: Session, item_id: int, item: schemas.ItemUpdate) -> Optional[models.Item]:
+def item_updated(db_item: models.Item) -> models.Item:
+    item_cache.invalidate(f"item:{db_item.id}")
+    item_changes.publish([("updated", db_item.id, item_json(db_item))])
+    return db_item
+
+def item_deleted(item_id: int, db_item: models.Item) -> models.Item:
+    item_cache.invalidate(f"item:{item_id}")
+    item_changes.publish([("deleted", item_id, None)])
+    return db_item
+
+def _unchanged_since(expected_version: Tuple):
+    """WHERE clause matching a row that still has `expected_version`"""
+    expected_updated_at = expected_version[2]
+    if expected_updated_at is None:
+        return models.Item.updated_at.is_(None)
+    return models.Item.updated_at == expected_updated_at
+
+def item_update_statement(item_id: int, update_data: dict, expected_version: Optional[Tuple] = None):
+    """UPDATE ... RETURNING for one item, compare-and-set when `expected_version` is given"""
+    stmt = update(models.Item).where(models.Item.id == item_id)
+    if expected_version is not None:
+        stmt = stmt.where(_unchanged_since(expected_version))
+    return stmt.values(**update_data).returning(models.Item).execution_options(populate_existing=True)
+
+def update_item(db: Session, item_id: int, item: schemas.ItemUpdate, expected_version: Optional[Tuple] = None) -> Optional[models.Item]:
+    """Apply a partial update. With `expected_version` the write only happens if
+    the row still has that version, else StaleItemError is raised."""
+    update_data = item.model_dump(exclude_unset=True)
+    if not update_data:
+        return get_item(db, item_id)
+    if not supports_returning(db, "update"):
+        return _update_item_fetched(db, item_id, update_data, expected_version)
+    db_item = db.scalars(item_update_statement(item_id, update_data, expected_version)).one_or_none()
+    if db_item is None:
+        db.rollback()
+        # Nothing matched: either the item is gone or it changed since expected_version
+        if expected_version is not None and get_item_version(db, item_id) is not None:
+            raise StaleItemError(item_id)
+        return None
+    return item_updated(commit_returning(db, db_item))
+
+def _update_item_fetched(db: Session, item_id: int, update_data: dict, expected_version: Optional[Tuple]) -> Optional[models.Item]:
     db_item = get_item(db, item_id)
     if db_item:
-        update_data = item.model_dump(exclude_unset=True)
+        if expected_version is not None:
+            # Compare-and-set in one statement so a concurrent writer cannot slip in
+            matched = (
+                db.query(models.Item)
+                .filter(models.Item.id == item_id, _unchanged_since(expected_version))
+                .update(update_data, synchronize_session="fetch")
+            )
+            if not matched:
+                db.rollback()
+                raise StaleItemError(item_id)
         for field, value in update_data.items():
             setattr(db_item, field, value)
         db.commit()
         db.refresh(db_item)
+        item_updated(db_item)
     return db_item
 
+def item_delete_statement(item_id: int):
+    return delete(models.Item).where(models.Item.id == item_id).returning(models.Item).execution_options(populate_existing=True)
+
 def delete_item(db: Session, item_id: int) -> Optional[models.Item]:
-    db_item = get_item(db, item_id)
-    if db_item:
+    if supports_returning(db, "delete"):
+        db_item = db.scalars(item_delete_statement(item_id)).one_or_none()
+        if db_item is None:
+            db.rollback()
+            return None
+        commit_returning(db, db_item)
+    else:
+        db_item = get_item(db, item_id)
+        if db_item is None:
+            return None
         db.delete(db_item)
         db.commit()
-    return db_item
+    return item_deleted(item_id, db_item)
+
+
+# Bulk write operations: executemany statements, chunk_size rows at a time
+def _apply_in_chunks(
+    db: Session,
+    rows: list,
+    apply: Callable[[list], List[BulkOutcome]],
+    atomic: bool,
+    chunk_size: int,
+    ok_status: str,
+) -> List[BulkOutcome]:
+    """Run `apply` over the rows chunk by chunk. Atomic mode uses one transaction
+    and rolls everything back on the first failing row. Best-effort mode commits
+    each chunk and, when a chunk fails, retries its rows one by one so that only
+    the offending rows are reported as failed."""
+    outcomes: List[BulkOutcome] = []
+    if atomic:
+        try:
+            for start in range(0, len(rows), chunk_size):
+                outcomes += apply(rows[start:start + chunk_size])
+        except SQLAlchemyError as exc:
+            db.rollback()
+            raise BulkAbortedError([(None, "failed", str(getattr(exc, "orig", None) or exc))]) from exc
+        if any(status != ok_status for _, status, _ in outcomes):
+            db.rollback()
+            raise BulkAbortedError(outcomes)
+        db.commit()
+        return outcomes
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            chunk_outcomes = apply(chunk)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            chunk_outcomes = []
+            for row in chunk:
+                try:
+                    chunk_outcomes += apply([row])
+                    db.commit()
+                except SQLAlchemyError as exc:
+                    db.rollback()
+                    chunk_outcomes.append((None, "failed", str(getattr(exc, "orig", None) or exc)))
+        outcomes += chunk_outcomes
+    return outcomes
+
+def _publish_outcomes(kind: str, outcomes: List[BulkOutcome]) -> None:
+    # Bulk events carry ids only; clients fetch the rows with POST /items/lookup
+    item_changes.publish((kind, item_id, None) for item_id, status, _ in outcomes if status == kind)
+
+def _existing_ids(db: Session, item_ids: List[int]) -> set:
+    return set(db.scalars(select(models.Item.id).where(models.Item.id.in_(item_ids))))
+
+def bulk_create_items(db: Session, items: List[schemas.ItemCreate], atomic: bool = True, chunk_size: int = 500) -> List[BulkOutcome]:
+    sqlite = db.get_bind().dialect.name == "sqlite"
+
+    def apply(chunk: List[schemas.ItemCreate]) -> List[BulkOutcome]:
+        rows = [item.model_dump() for item in chunk]
+        if sqlite:
+            # sort_by_parameter_order makes SQLite insert one row per statement.
+            # A single multi-row INSERT gets its rowids in VALUES order under
+            # the write lock, so the sorted ids line up with the rows.
+            item_ids = sorted(db.scalars(insert(models.Item).returning(models.Item.id), rows).all())
+        else:
+            item_ids = db.scalars(insert(models.Item).returning(models.Item.id, sort_by_parameter_order=True), rows).all()
+        return [(item_id, "created", None) for item_id in item_ids]
+
+    try:
+        outcomes = _apply_in_chunks(db, items, apply, atomic, chunk_size, "created")
+    finally:
+        item_cache.invalidate()
+    _publish_outcomes("created", outcomes)
+    return outcomes
+
+def bulk_update_items(db: Session, items: List[schemas.ItemBulkUpdate], atomic: bool = True, chunk_size: int = 500) -> List[BulkOutcome]:
+    def apply(chunk: List[schemas.ItemBulkUpdate]) -> List[BulkOutcome]:
+        existing = _existing_ids(db, [item.id for item in chunk])
+        now = utcnow()
+        params = [
+            {**item.model_dump(exclude_unset=True), "id": item.id, "updated_at": now}
+            for item in chunk if item.id in existing
+        ]
+        if params:
+            db.execute(update(models.Item), params)
+        return [
+            (item.id, "updated", None) if item.id in existing else (item.id, "not_found", "Item not found")
+            for item in chunk
+        ]
+
+    try:
+        outcomes = _apply_in_chunks(db, items, apply, atomic, chunk_size, "updated")
+    finally:
+        item_cache.invalidate(*(f"item:{item.id}" for item in items))
+    _publish_outcomes("updated", outcomes)
+    return outcomes
+
+def bulk_delete_items(db: Session, item_ids: List[int], atomic: bool = True, chunk_size: int = 500) -> List[BulkOutcome]:
+    def apply(chunk: List[int]) -> List[BulkOutcome]:
+        existing = _existing_ids(db, chunk)
+        if existing:
+            db.execute(delete(models.Item).where(models.Item.id.in_(existing)))
+        return [
+            (item_id, "deleted", None) if item_id in existing else (item_id, "not_found", "Item not found")
+            for item_id in chunk
+        ]
+
+    try:
+        outcomes = _apply_in_chunks(db, item_ids, apply, atomic, chunk_size, "deleted")
+    finally:
+        item_cache.invalidate(*(f"item:{item_id}" for item_id in item_ids))
+    _publish_outcomes("deleted", outcomes)
+    return outcomes
@@ -1,8 +1,12 @@
+from sqlalchemy import Select, case, delete, insert, select, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 from app.models import users as models
 from app.schemas import users as schemas
 from app.core.security import get_password_hash
+from app.core.cache import principal_cache, token_versions
+from app.core.serialization import dumps, field_columns
+from app.db.database import commit_returning, supports_returning
 
 # User CRUD operations
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
@@ -14,37 +18,180 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
 def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.username == username).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_token_version(db: Session, user_id: int) -> Optional[int]:
+    """The user's current token version, or None when the user no longer exists"""
+    return db.scalar(select(models.User.token_version).where(models.User.id == user_id))
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(
+def get_users_by_ids(db: Session, user_ids: List[int], chunk_size: int = 500) -> Dict[int, models.User]:
+    """Users keyed by id, one IN (...) query per `chunk_size` ids; unknown ids are left out"""
+    unique_ids = list(dict.fromkeys(user_ids))
+    users = {}
+    for start in range(0, len(unique_ids), chunk_size):
+        chunk = unique_ids[start:start + chunk_size]
+        users.update((user.id, user) for user in db.scalars(select(models.User).where(models.User.id.in_(chunk))))
+    return users
+
+def users_page_query(skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc", columns: Sequence = ()) -> Select:
+    """Page of users ordered by id; `after_id` switches from OFFSET to keyset paging.
+    Selects whole rows unless specific `columns` are given."""
+    stmt = select(*columns) if columns else select(models.User)
+    if sort == "desc":
+        stmt = stmt.order_by(models.User.id.desc())
+        if after_id is not None:
+            stmt = stmt.where(models.User.id < after_id)
+    else:
+        stmt = stmt.order_by(models.User.id)
+        if after_id is not None:
+            stmt = stmt.where(models.User.id > after_id)
+    if after_id is None:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+def get_users(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc") -> List[models.User]:
+    return list(db.scalars(users_page_query(skip, limit, after_id, sort)))
+
+# Versions: (id, created_at, updated_at) tuples for HTTP validators, without loading whole rows
+VERSION_COLUMNS = (models.User.id, models.User.created_at, models.User.updated_at)
+
+def get_user_version(db: Session, user_id: int) -> Optional[Tuple]:
+    row = db.execute(select(*VERSION_COLUMNS).where(models.User.id == user_id)).first()
+    return None if row is None else tuple(row)
+
+def get_users_versions(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc") -> List[Tuple]:
+    return [tuple(row) for row in db.execute(users_page_query(skip, limit, after_id, sort, columns=VERSION_COLUMNS))]
+
+# Columns behind each public schemas.User field; hashed_password is never selected
+USER_COLUMNS = {name: getattr(models.User, name) for name in schemas.User.model_fields}
+
+def get_users_payload(db: Session, fields: Optional[Sequence[str]] = None, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, sort: str = "asc") -> Tuple[bytes, List[Tuple]]:
+    """A serialized page of users, with only `fields` of each when given, and
+    the page's versions. Rows are selected as columns and encoded directly,
+    without building ORM objects or re-validating them through schemas.User."""
+    fields = list(fields or USER_COLUMNS)
+    columns = field_columns(USER_COLUMNS, fields, VERSION_COLUMNS)
+    return fields_payload(fields, db.execute(users_page_query(skip, limit, after_id, sort, columns=columns)).all())
+
+def fields_payload(fields: Sequence[str], rows) -> Tuple[bytes, List[Tuple]]:
+    payload = dumps([dict(zip(fields, row)) for row in rows])
+    return payload, [(row.id, row.created_at, row.updated_at) for row in rows]
+
+# Streaming reads for exports; only the public schemas.User fields are selected
+EXPORT_COLUMNS = tuple(USER_COLUMNS.values())
+
+def export_query(batch_size: int) -> Select:
+    return select(*EXPORT_COLUMNS).order_by(models.User.id).execution_options(yield_per=batch_size)
+
+def iter_user_rows(db: Session, batch_size: int = 1000) -> Iterator[Mapping]:
+    for row in db.execute(export_query(batch_size)):
+        yield row._mapping
+
+# Writes are single INSERT/UPDATE/DELETE ... RETURNING statements; databases
+# without RETURNING fall back to load, modify, commit and refresh
+def user_values(user: schemas.UserCreate, hashed_password: str) -> dict:
+    return dict(
         username=user.username,
         email=user.email,
         full_name=user.full_name,
         hashed_password=hashed_password
     )
+
+def user_insert_statement(values: dict):
+    return insert(models.User).values(**values).returning(models.User)
+
+def create_user(db: Session, user: schemas.UserCreate) -> models.User:
+    values = user_values(user, get_password_hash(user.password))
+    if supports_returning(db, "insert"):
+        return commit_returning(db, db.scalars(user_insert_statement(values)).one())
+    db_user = models.User(**values)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
+def apply_user_update(db_user: models.User, update_data: dict) -> str:
+    """Copy already-hashed update fields onto a user and return its previous username"""
+    old_username = db_user.username
+    if "hashed_password" in update_data or update_data.get("username", old_username) != old_username:
+        # Revoke tokens issued for the old credentials
+        update_data["token_version"] = (db_user.token_version or 0) + 1
+    for field, value in update_data.items():
+        setattr(db_user, field, value)
+    return old_username
+
+def user_update_statement(user_id: int, update_data: dict):
+    """UPDATE ... RETURNING for already-hashed update fields, bumping the token
+    version in the same statement when the credentials change"""
+    values = dict(update_data)
+    if "hashed_password" in values:
+        values["token_version"] = models.User.token_version + 1
+    elif "username" in values:
+        values["token_version"] = case(
+            (models.User.username != values["username"], models.User.token_version + 1),
+            else_=models.User.token_version,
+        )
+    return update(models.User).where(models.User.id == user_id).values(**values).returning(models.User).execution_options(populate_existing=True)
+
+# After a committed write: drop the cached principal and token version so
+# this worker sees the change at once. Shared with app.crud.async_users.
+def forget_user(user_id: int, username: str) -> None:
+    principal_cache.delete(username)
+    token_versions.delete(user_id)
+
+def evict_principal(user_id: int, update_data: dict, username: str) -> None:
+    forget_user(user_id, username)
+    if "username" in update_data:
+        # The entry for the previous username is not known from RETURNING
+        principal_cache.delete_where(lambda principal: principal.id == user_id)
+
 def update_user(db: Session, user_id: int, user: schemas.UserUpdate) -> Optional[models.User]:
+    update_data = user.model_dump(exclude_unset=True)
+    if "password" in update_data:
+        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+    if not update_data:
+        return get_user(db, user_id)
+    if not supports_returning(db, "update"):
+        return _update_user_fetched(db, user_id, update_data)
+    db_user = db.scalars(user_update_statement(user_id, update_data)).one_or_none()
+    if db_user is None:
+        db.rollback()
+        return None
+    commit_returning(db, db_user)
+    evict_principal(user_id, update_data, db_user.username)
+    return db_user
+
+def _update_user_fetched(db: Session, user_id: int, update_data: dict) -> Optional[models.User]:
     db_user = get_user(db, user_id)
     if db_user:
-        update_data = user.model_dump(exclude_unset=True)
-        if "password" in update_data:
-            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
-        for field, value in update_data.items():
-            setattr(db_user, field, value)
+        old_username = apply_user_update(db_user, update_data)
         db.commit()
         db.refresh(db_user)
+        principal_cache.delete(old_username)
+        forget_user(user_id, db_user.username)
     return db_user
 
+def rehash_statement(user_id: int, hashed_password: str):
+    return update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password).execution_options(synchronize_session=False)
+
+def rehash_user_password(db: Session, user_id: int, hashed_password: str) -> None:
+    """Store a fresh hash of the same password; existing tokens stay valid"""
+    db.execute(rehash_statement(user_id, hashed_password))
+    db.commit()
+
+def user_delete_statement(user_id: int):
+    return delete(models.User).where(models.User.id == user_id).returning(models.User).execution_options(populate_existing=True)
+
 def delete_user(db: Session, user_id: int) -> Optional[models.User]:
-    db_user = get_user(db, user_id)
-    if db_user:
+    if supports_returning(db, "delete"):
+        db_user = db.scalars(user_delete_statement(user_id)).one_or_none()
+        if db_user is None:
+            db.rollback()
+            return None
+        commit_returning(db, db_user)
+    else:
+        db_user = get_user(db, user_id)
+        if db_user is None:
+            return None
         db.delete(db_user)
         db.commit()
-    return db_user 
\ No newline at end of file
+    forget_user(user_id, db_user.username)
+    return db_user
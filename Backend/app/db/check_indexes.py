@@ -0,0 +1,62 @@
+import argparse
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.crud import items as crud_items
+from app.db.database import SessionLocal, engine
+from app.schemas import items
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# The filter combinations GET /items/ is expected to serve from an index
+CASES: Dict[str, Tuple[items.ItemFilters, List[Tuple[str, bool]]]] = {
+    "available in price range": (items.ItemFilters(is_available=True, min_price=10, max_price=50), []),
+    "available, cheapest first": (items.ItemFilters(is_available=True), [("price", False)]),
+    "price range": (items.ItemFilters(min_price=10, max_price=50), []),
+    "name prefix": (items.ItemFilters(name_prefix="Lap"), []),
+    "created window": (items.ItemFilters(created_after=NOW), [("created_at", True)]),
+    "updated window": (items.ItemFilters(updated_after=NOW), [("updated_at", True)]),
+}
+
+def explain(db: Session, filters: items.ItemFilters, order_by) -> List[str]:
+    stmt = crud_items.items_page_query(limit=10, filters=filters, order_by=order_by)
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    # Small tables make a sequential scan the cheapest plan; ask whether an index
+    # could be used at all
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    return [row[0] for row in db.execute(text(f"EXPLAIN {sql}"))]
+
+def is_full_scan(plan: List[str]) -> bool:
+    if engine.dialect.name == "sqlite":
+        return any(line.startswith("SCAN items") and "USING" not in line for line in plan)
+    return any("Seq Scan on items" in line for line in plan)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN the common item filters and fail on full table scans")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every query plan")
+    args = parser.parse_args()
+
+    failures = 0
+    db = SessionLocal()
+    try:
+        for name, (filters, order_by) in CASES.items():
+            plan = explain(db, filters, order_by)
+            full_scan = is_full_scan(plan)
+            failures += full_scan
+            print(f"{'FULL SCAN' if full_scan else 'ok':9}  {name}")
+            if args.verbose or full_scan:
+                for line in plan:
+                    print(f"           {line}")
+            db.rollback()
+    finally:
+        db.close()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import argparse
+import sys
+
+from app.crud import items as crud_items
+from app.db.database import SessionLocal
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the running item stats with a full count of items")
+    parser.add_argument("--fix", action="store_true", help="rebuild the stats when they differ")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drift = crud_items.check_item_stats(db)
+        for name, (kept, actual) in drift.items():
+            print(f"DRIFT  {name}: stats say {kept}, items have {actual}")
+        if not drift:
+            print("ok     item stats match the items table")
+            return 0
+        if args.fix:
+            crud_items.rebuild_item_stats(db)
+            print("fixed  stats rebuilt from items")
+            return 0
+    finally:
+        db.close()
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,338 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core import metrics
 from app.core.settings import settings
 
+# asyncio driver used for each backend when the async path is enabled
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+_url = make_url(settings.database_url)
+_backend = _url.get_backend_name()
+async_enabled = settings.database_async or _url.get_driver_name() in ASYNC_DRIVERS.values()
+
+# The sync engine always exists; an async driver in DATABASE_URL maps back to the default sync one
+sync_database_url = _url.set(drivername=_backend) if _url.get_driver_name() in ASYNC_DRIVERS.values() else _url
+async_database_url = _url.set(drivername=f"{_backend}+{ASYNC_DRIVERS.get(_backend, _url.get_driver_name())}")
+
+# Statements slower than settings.slow_query_threshold_ms
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+# Engine tuning profiles (settings.db_profile)
+DB_PROFILES: Dict[str, Dict[str, Any]] = {
+    # WAL lets readers run alongside the single writer instead of queueing behind it
+    "sqlite-wal": {
+        "pool": {"pool_size": 8, "max_overflow": 8, "pool_timeout": 30, "pool_pre_ping": False},
+        "query_cache_size": 1200,
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # KiB when negative: 64 MiB
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+    },
+    "postgres-oltp": {
+        "pool": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10, "pool_recycle": 1800, "pool_pre_ping": True},
+        "query_cache_size": 1200,
+        "pragmas": {},
+    },
+    "custom": {"pool": {}, "query_cache_size": None, "pragmas": {}},
+}
+
+def resolve_profile(url: URL, profile: Optional[str] = None) -> str:
+    profile = profile or settings.db_profile
+    if profile == "auto":
+        return {"sqlite": "sqlite-wal", "postgresql": "postgres-oltp"}.get(url.get_backend_name(), "custom")
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Unknown db_profile {profile!r}; choose from auto, {', '.join(DB_PROFILES)}")
+    return profile
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+def engine_options(url: URL, profile: Optional[str] = None) -> Dict[str, Any]:
+    """create_engine() keyword arguments and SQLite PRAGMAs for a profile, with
+    the explicit db_* settings applied on top"""
+    profile = resolve_profile(url, profile)
+    preset = DB_PROFILES[profile]
+    pool = dict(preset["pool"])
+    overrides = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    pool.update({key: value for key, value in overrides.items() if value is not None})
+    pragmas = dict(preset["pragmas"]) if url.get_backend_name() == "sqlite" else {}
+    if url.get_backend_name() == "sqlite":
+        pragmas.update(settings.db_sqlite_pragmas)
+    if _is_memory_sqlite(url):
+        # One shared connection: no pool to size, and WAL does not apply in memory
+        pool = {key: value for key, value in pool.items() if key == "pool_pre_ping"}
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+    query_cache_size = settings.db_query_cache_size if settings.db_query_cache_size is not None else preset["query_cache_size"]
+    kwargs: Dict[str, Any] = dict(pool)
+    if query_cache_size is not None:
+        kwargs["query_cache_size"] = query_cache_size
+    return {"profile": profile, "kwargs": kwargs, "pragmas": pragmas}
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+class _TimedCheckout:
+    """Pool mixin recording how long a checkout waited for a connection"""
+
+    label = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout_wait.observe(time.perf_counter() - started, self.label)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.label = self.label
+        return pool
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def _value_types(values) -> str:
+    names = [type(value).__name__ for value in values]
+    # Long IN lists collapse to "(1000 x int)"
+    if len(names) > 5 and len(set(names)) == 1:
+        return f"({len(names)} x {names[0]})"
+    return "(" + ", ".join(names) + ")"
+
+def parameters_shape(parameters, executemany: bool = False) -> str:
+    """Names and types of bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} x {parameters_shape(rows[0]) if rows else '()'}"
+    if not parameters:
+        return "()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    return _value_types(parameters)
+
+def log_slow_query(label: str, statement: str, parameters, elapsed: float, executemany: bool) -> None:
+    stats = metrics.request_stats.get()
+    route = "-"
+    if stats is not None and stats.scope is not None:
+        route = f"{stats.scope['method']} {getattr(stats.scope.get('route'), 'path', stats.scope['path'])}"
+    slow_query_logger.warning(
+        "Slow query %.1f ms on %s (route %s): %s -- parameters %s",
+        elapsed * 1000, label, route, " ".join(statement.split())[:2000], parameters_shape(parameters, executemany),
+    )
+
+def instrument_engine(
+    db_engine: Engine, label: str, record_metrics: bool = True, slow_query_seconds: Optional[float] = None
+) -> None:
+    """Count statements and their execution time, globally and for the
+    current request (see app.core.metrics.request_stats), and log those
+    slower than `slow_query_seconds`. The dialect's do_execute hooks wrap the
+    driver call with a single event dispatch, about half the cost of a
+    before/after_cursor_execute pair."""
+    if isinstance(db_engine.pool, _TimedCheckout):
+        db_engine.pool.label = label
+
+    def timed(execute, executemany: bool = False):
+        def run(*args):
+            started = time.perf_counter()
+            try:
+                execute(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                if record_metrics:
+                    metrics.db_query_duration.observe(elapsed, label)
+                    stats = metrics.request_stats.get()
+                    if stats is not None:
+                        stats.queries += 1
+                        stats.query_seconds += elapsed
+                if slow_query_seconds is not None and elapsed >= slow_query_seconds:
+                    # (cursor, statement, parameters, context) or (cursor, statement, context)
+                    log_slow_query(label, args[1], args[2] if len(args) == 4 else None, elapsed, executemany)
+            # Tells SQLAlchemy the statement has been executed
+            return True
+        return run
+
+    dialect = db_engine.dialect
+    event.listen(db_engine, "do_execute", timed(dialect.do_execute))
+    event.listen(db_engine, "do_executemany", timed(dialect.do_executemany, executemany=True))
+    event.listen(db_engine, "do_execute_no_params", timed(dialect.do_execute_no_params))
+
+def _instrument(db_engine: Engine, label: str) -> None:
+    # Nothing is attached unless metrics or the slow-query log are on
+    threshold = settings.slow_query_threshold_ms
+    if settings.metrics_enabled or threshold is not None:
+        instrument_engine(
+            db_engine, label,
+            record_metrics=settings.metrics_enabled,
+            slow_query_seconds=threshold / 1000 if threshold is not None else None,
+        )
+
+def _pool_class(url: URL, kwargs: Dict[str, Any], timed: type) -> Dict[str, Any]:
+    # In-memory SQLite keeps its single shared connection pool
+    if not settings.metrics_enabled or "poolclass" in kwargs or _is_memory_sqlite(url):
+        return {}
+    return {"poolclass": timed}
+
+def create_db_engine(url: URL, profile: Optional[str] = None, label: str = "primary", **kwargs) -> Engine:
+    """Sync engine for `url` tuned by a profile; `label` names it in /metrics"""
+    options = engine_options(url, profile)
+    connect_args = {"check_same_thread": False} if url.get_backend_name() == "sqlite" else {}
+    kwargs = {**options["kwargs"], **kwargs}
+    db_engine = create_engine(url, connect_args=connect_args, **_pool_class(url, kwargs, TimedQueuePool), **kwargs)
+    apply_sqlite_pragmas(db_engine, options["pragmas"])
+    _instrument(db_engine, label)
+    return db_engine
+
 # Create SQLAlchemy engine
-engine = create_engine(
-    settings.database_url,
-    echo=settings.database_echo,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+engine_settings = engine_options(sync_database_url)
+engine = create_db_engine(sync_database_url, echo=settings.database_echo)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional asyncio engine (requires aiosqlite/asyncpg, see the "async" extra)
+async_engine = None
+AsyncSessionLocal = None
+if async_enabled:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _async_options = engine_options(async_database_url)
+    async_engine = create_async_engine(
+        async_database_url,
+        echo=settings.database_echo,
+        **_pool_class(async_database_url, _async_options["kwargs"], TimedAsyncAdaptedQueuePool),
+        **_async_options["kwargs"],
+    )
+    apply_sqlite_pragmas(async_engine.sync_engine, _async_options["pragmas"])
+    _instrument(async_engine.sync_engine, "primary-async")
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+def describe_engine(db_engine: Optional[Engine] = None) -> str:
+    """One line with the effective engine settings; PRAGMAs are read back from
+    a live connection so a setting SQLite refused shows up as such"""
+    db_engine = db_engine or engine
+    parts = [f"profile={engine_settings['profile']}", f"pool={type(db_engine.pool).__name__}"]
+    parts += [f"{name}={value}" for name, value in engine_settings["kwargs"].items()]
+    if db_engine.dialect.name == "sqlite" and engine_settings["pragmas"]:
+        with db_engine.connect() as connection:
+            for name in engine_settings["pragmas"]:
+                parts.append(f"{name}={connection.exec_driver_sql(f'PRAGMA {name}').scalar()}")
+    return " ".join(parts)
+
 # Create Base class
 Base = declarative_base()
 
+def utcnow() -> datetime:
+    """Application-side timestamp with microsecond precision (SQLite's
+    CURRENT_TIMESTAMP only has seconds, too coarse for ETags)"""
+    return datetime.now(timezone.utc)
+
+def supports_returning(db, statement: str) -> bool:
+    """Whether the database can return rows from an "insert", "update" or
+    "delete" statement (SQLite 3.35+, PostgreSQL)"""
+    return getattr(db.get_bind().dialect, f"{statement}_returning", False)
+
+def commit_returning(db, obj):
+    """Commit, keeping the attributes `obj` was loaded with by RETURNING.
+    Detaching it first stops expire-on-commit from costing a refresh SELECT
+    the next time the object is read."""
+    if obj is not None and obj in db:
+        db.expunge(obj)
+    db.commit()
+    return obj
+
+class SessionCounters:
+    """How many sessions the dependencies handed out versus how many were
+    actually opened; the difference is requests answered without the database"""
+
+    def __init__(self):
+        self.provided = 0
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+session_counters = SessionCounters()
+
+class LazySession:
+    """Stands in for a Session and creates it on first use, so a request that
+    is answered from a cache never builds a session or checks out a connection"""
+
+    __slots__ = ("_factory", "_session")
+
+    def __init__(self, factory: Callable[[], Session]):
+        self._factory = factory
+        self._session: Optional[Session] = None
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def _get(self) -> Session:
+        if self._session is None:
+            self._session = self._factory()
+            session_counters.count("opened")
+        return self._session
+
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
+    def __contains__(self, instance) -> bool:
+        return self._session is not None and instance in self._session
+
+    def __iter__(self):
+        return iter(self._session or ())
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
 # Dependency to get database session
 def get_db():
-    db = SessionLocal()
+    session_counters.count("provided")
+    db = LazySession(SessionLocal)
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("The async database path is disabled; set DATABASE_ASYNC=true")
+    async with AsyncSessionLocal() as db:
+        yield db
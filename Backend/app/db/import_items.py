@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import gzip
+import json
+import queue
+import sys
+import time
+import zlib
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.settings import settings
+from app.crud import items as crud_items
+from app.db.database import SessionLocal
+from app.schemas import items
+
+class LineFeed:
+    """Bounded hand-off of text lines from a producer (an HTTP upload) to the
+    import thread. When the queue is full the producer waits, which is what
+    applies backpressure to the upload."""
+
+    def __init__(self, maxsize: int = 64):
+        self._queue: "queue.Queue[Optional[List[str]]]" = queue.Queue(maxsize)
+        self.consumer_stopped = False
+
+    def put(self, lines: Optional[List[str]]) -> bool:
+        """Blocking put; returns False once the consumer has stopped reading"""
+        while not self.consumer_stopped:
+            try:
+                self._queue.put(lines, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self) -> None:
+        self.put(None)
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            while True:
+                lines = self._queue.get()
+                if lines is None:
+                    return
+                yield from lines
+        finally:
+            self.consumer_stopped = True
+
+def split_lines(text: str) -> Tuple[List[str], str]:
+    """Complete lines of `text` and the unterminated rest. Only a line feed
+    ends a line, and a carriage return before it is dropped: str.splitlines()
+    would also break on U+2028, U+2029, form feeds and other separators that
+    JSON strings may hold unescaped. A carriage return at the very end stays
+    in the rest, so a CRLF split across two chunks still ends one line."""
+    *lines, rest = text.split("\n")
+    return [(line[:-1] if line.endswith("\r") else line) + "\n" for line in lines], rest
+
+# Called after each committed batch with (rows imported, checkpoint line, elapsed seconds)
+Progress = Callable[[int, int, float], None]
+
+def _numbered_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, raw record); a record that fails to parse is yielded as the exception"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: (value if value != "" else None) for key, value in row.items()}
+        return
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as exc:
+            yield line_no, exc
+
+def run_import(
+    lines: Iterable[str],
+    fmt: str = "ndjson",
+    batch_size: int = 1000,
+    start_line: int = 0,
+    max_errors: int = 1000,
+    progress: Optional[Progress] = None,
+) -> items.ImportReport:
+    """Validate rows against schemas.ItemCreate and insert them in batched
+    transactions. Lines up to and including `start_line` are skipped, so a
+    failed import can resume from the last reported checkpoint, which
+    `progress` is given after every batch."""
+    started = time.perf_counter()
+    rows_read = rows_imported = rows_failed = 0
+    checkpoint = start_line
+    errors: List[items.ImportRowError] = []
+    batch: List[Tuple[int, items.ItemCreate]] = []
+
+    def record_error(line_no: int, message: str) -> None:
+        nonlocal rows_failed
+        rows_failed += 1
+        if len(errors) < max_errors:
+            errors.append(items.ImportRowError(line=line_no, error=message))
+
+    def flush(db) -> None:
+        nonlocal rows_imported, checkpoint
+        if not batch:
+            return
+        outcomes = crud_items.bulk_create_items(db, [item for _, item in batch], atomic=False, chunk_size=batch_size)
+        for (line_no, _), (_, status, error) in zip(batch, outcomes):
+            if error is None:
+                rows_imported += 1
+            else:
+                record_error(line_no, error)
+        checkpoint = max(checkpoint, batch[-1][0])
+        batch.clear()
+        if progress is not None:
+            progress(rows_imported, checkpoint, time.perf_counter() - started)
+
+    db = SessionLocal()
+    try:
+        for line_no, record in _numbered_records(lines, fmt):
+            if line_no <= start_line:
+                continue
+            rows_read += 1
+            if isinstance(record, Exception):
+                record_error(line_no, f"Unparseable line: {record}")
+                continue
+            try:
+                batch.append((line_no, items.ItemCreate.model_validate(record)))
+            except ValidationError as exc:
+                record_error(line_no, "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors()))
+                continue
+            if len(batch) >= batch_size:
+                flush(db)
+        flush(db)
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    return items.ImportReport(
+        rows_read=rows_read,
+        rows_imported=rows_imported,
+        rows_failed=rows_failed,
+        checkpoint_line=checkpoint,
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round(rows_imported / elapsed, 1) if elapsed else 0.0,
+        errors=errors,
+        errors_truncated=rows_failed > len(errors),
+    )
+
+async def import_stream(
+    chunks: AsyncIterator[bytes],
+    fmt: str = "ndjson",
+    start_line: int = 0,
+    compressed: bool = False,
+    progress: Optional[Progress] = None,
+) -> items.ImportReport:
+    """Import an upload as it arrives: complete lines are handed to the import
+    thread while the rest of the body is still being received. `progress`
+    is called from that thread."""
+    feed = LineFeed(settings.import_queue_chunks)
+
+    def consume() -> items.ImportReport:
+        try:
+            return run_import(feed, fmt, settings.import_batch_size, start_line, progress=progress)
+        finally:
+            # Never leave the upload blocked on a queue nobody reads
+            feed.consumer_stopped = True
+
+    worker = asyncio.ensure_future(run_in_threadpool(consume))
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    inflater = zlib.decompressobj(wbits=31) if compressed else None
+    pending = ""
+    try:
+        async for chunk in chunks:
+            if inflater is not None:
+                chunk = inflater.decompress(chunk)
+            lines, pending = split_lines(pending + decoder.decode(chunk))
+            if lines and not await run_in_threadpool(feed.put, lines):
+                break
+        tail = pending + decoder.decode(inflater.flush() if inflater is not None else b"", final=True)
+        if tail:
+            await run_in_threadpool(feed.put, [tail])
+    finally:
+        await run_in_threadpool(feed.close)
+    return await worker
+
+async def import_progress(
+    chunks: AsyncIterator[bytes],
+    fmt: str = "ndjson",
+    start_line: int = 0,
+    compressed: bool = False,
+) -> AsyncIterator[bytes]:
+    """import_stream() reported as NDJSON: a {"rows_imported", "checkpoint_line"}
+    line as each batch commits, then the final report"""
+    loop = asyncio.get_running_loop()
+    events: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+
+    def progress(rows: int, checkpoint: int, elapsed: float) -> None:
+        event = json.dumps({"rows_imported": rows, "checkpoint_line": checkpoint}) + "\n"
+        loop.call_soon_threadsafe(events.put_nowait, event.encode())
+
+    task = asyncio.ensure_future(import_stream(chunks, fmt, start_line, compressed, progress))
+    # Queued after every progress event the import thread has already sent
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+        yield task.result().model_dump_json().encode() + b"\n"
+    finally:
+        task.cancel()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import items from an NDJSON or CSV file")
+    parser.add_argument("path", help="input file, '-' for stdin; a .gz suffix is decompressed")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=settings.import_batch_size)
+    parser.add_argument("--start-line", type=int, default=0, help="resume after this line (a previous checkpoint_line)")
+    parser.add_argument("--max-errors", type=int, default=1000, help="row errors to keep in the report")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.path.removesuffix(".gz").endswith(".csv") else "ndjson")
+    if args.path == "-":
+        stream = sys.stdin
+    elif args.path.endswith(".gz"):
+        stream = gzip.open(args.path, "rt", encoding="utf-8", newline="")
+    else:
+        stream = open(args.path, encoding="utf-8", newline="")
+
+    def progress(rows: int, checkpoint: int, elapsed: float) -> None:
+        print(f"{rows} rows imported, committed through line {checkpoint}, {rows / elapsed:.0f} rows/s", file=sys.stderr)
+
+    with stream:
+        report = run_import(stream, fmt, args.batch_size, args.start_line, args.max_errors, progress)
+    print(report.model_dump_json(indent=2))
+
+if __name__ == "__main__":
+    main()
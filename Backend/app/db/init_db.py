@@ -1,5 +1,23 @@
+import argparse
+import csv
+import io
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import DateTime, func, insert, select, text
+from sqlalchemy.engine import Engine
+
+from app.core.security import pwd_context
 from app.crud import items as crud_items,users as crud_users
 from app.models import items as item_model , users as user_model
+from app.models.items import SEARCH_DDL, STATS_DDL, STATS_REBUILD, STATS_TRIGGERS
 from app.db.database import SessionLocal, engine
 from app.schemas import items,users
 
@@ -77,9 +95,285 @@ def init_db():
     finally:
         db.close()
 
-if __name__ == "__main__":
+# Synthetic data (python -m app.db.init_db --users N --items M)
+
+# Timestamps are spread over the two years before this instant, so a given
+# seed always produces the same rows
+DEFAULT_UNTIL = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HISTORY_SECONDS = timedelta(days=730).total_seconds()
+PRICE_MU, PRICE_SIGMA = math.log(40), 1.1
+
+FIRST_NAMES = ["Ada", "Alan", "Grace", "Linus", "Margaret", "Dennis", "Barbara", "Ken", "Frances", "Guido",
+               "Katherine", "Tim", "Radia", "Bjarne", "Hedy", "John", "Anita", "Edsger", "Sophie", "Donald"]
+LAST_NAMES = ["Lovelace", "Turing", "Hopper", "Torvalds", "Hamilton", "Ritchie", "Liskov", "Thompson", "Allen",
+              "van Rossum", "Johnson", "Berners-Lee", "Perlman", "Stroustrup", "Lamarr", "McCarthy", "Borg",
+              "Dijkstra", "Wilson", "Knuth"]
+ADJECTIVES = ["wireless", "ergonomic", "compact", "vintage", "portable", "premium", "rugged", "smart", "silent",
+              "modular", "refurbished", "mechanical", "slim", "heavy-duty", "foldable"]
+NOUNS = ["laptop", "keyboard", "mouse", "monitor", "lamp", "desk", "chair", "speaker", "camera", "charger",
+         "router", "tablet", "headset", "microphone", "dock", "cable", "backpack", "webcam"]
+PHRASES = ["for development", "with usb-c", "for gaming", "for the office", "with backlight", "for travel",
+           "made of steel", "with a two-year warranty", "in matte black", "with fast charging"]
+
+def _pick(rng: random.Random, words: List[str]) -> str:
+    # rng.choice() with a quarter of the overhead; deterministic all the same
+    return words[int(rng.random() * len(words))]
+
+def _timestamps(rng: random.Random, until: datetime, updated_share: float):
+    """created_at skewed towards recent dates (the catalogue grows over
+    time), and an updated_at after it for `updated_share` of the rows"""
+    age = HISTORY_SECONDS * (1 - math.sqrt(rng.random()))
+    created = until - timedelta(seconds=age)
+    updated = None
+    if rng.random() < updated_share:
+        updated = created + timedelta(seconds=age * rng.random())
+    return created, updated
+
+def _price(rng: random.Random) -> float:
+    # Log-normal around $40 with a long tail, mostly ending in .99
+    price = min(max(math.exp(PRICE_MU + PRICE_SIGMA * rng.gauss(0.0, 1.0)), 0.5), 20000)
+    if rng.random() < 0.7:
+        return max(math.floor(price) - 0.01, 0.99)
+    return round(price, 2)
+
+def generate_items(rng: random.Random, count: int, until: datetime = DEFAULT_UNTIL) -> Iterator[Dict]:
+    for _ in range(count):
+        created_at, updated_at = _timestamps(rng, until, updated_share=0.4)
+        price = _price(rng)
+        yield {
+            "name": f"{_pick(rng, ADJECTIVES)} {_pick(rng, NOUNS)} {100 + int(rng.random() * 9900)}",
+            "description": None if rng.random() < 0.1 else f"{_pick(rng, ADJECTIVES)} {_pick(rng, NOUNS)} {_pick(rng, PHRASES)}",
+            "price": price,
+            # Expensive items sell out less often
+            "is_available": rng.random() < (0.9 if price < 200 else 0.75),
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+def generate_users(
+    rng: random.Random, count: int, start: int, hashes: List[str], until: datetime = DEFAULT_UNTIL
+) -> Iterator[Dict]:
+    """Users start+1 .. start+count; `hashes` is cycled, so one shared hash works"""
+    for offset in range(count):
+        number = start + offset + 1
+        created_at, updated_at = _timestamps(rng, until, updated_share=0.2)
+        yield {
+            "username": f"user{number:07d}",
+            "email": f"user{number:07d}@example.com",
+            "full_name": None if rng.random() < 0.05 else f"{_pick(rng, FIRST_NAMES)} {_pick(rng, LAST_NAMES)}",
+            "hashed_password": hashes[offset % len(hashes)],
+            "is_active": rng.random() < 0.97,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+def synthetic_password(username: str) -> str:
+    return f"{username}-password"
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def hash_passwords(passwords: List[str], workers: int) -> List[str]:
+    """bcrypt each password, spread over `workers` processes"""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_hash, passwords, chunksize=64))
+
+def _batches(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    batch: List[Dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _sqlite_rows(table, columns: List[str], batch: List[Dict]) -> List[list]:
+    """Rows as value lists, datetimes in the text layout SQLAlchemy's SQLite
+    DateTime type stores (UTC, always with microseconds) so generated and
+    application-written rows compare alike"""
+    values_of = itemgetter(*columns)
+    datetimes = [index for index, column in enumerate(columns) if isinstance(table.c[column].type, DateTime)]
+    rows = []
+    for row in batch:
+        values = list(values_of(row))
+        for index in datetimes:
+            value = values[index]
+            if value is not None:
+                if value.tzinfo is not None:
+                    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+                values[index] = value.isoformat(" ", "microseconds")
+        rows.append(values)
+    return rows
+
+def _copy_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _write_batch(connection, table, batch: List[Dict]) -> None:
+    """Insert one batch through the fastest path the driver offers: COPY on
+    psycopg2, a plain executemany on sqlite3, SQLAlchemy's executemany elsewhere"""
+    columns = list(batch[0])
+    dialect = connection.dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([_copy_value(row[column]) for column in columns] for row in batch)
+        buffer.seek(0)
+        cursor = connection.connection.driver_connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    elif dialect.name == "sqlite" and dialect.driver == "pysqlite":
+        # SQLAlchemy's per-value bind processing costs several times the insert itself
+        cursor = connection.connection.driver_connection.cursor()
+        cursor.executemany(
+            f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            _sqlite_rows(table, columns, batch),
+        )
+    else:
+        connection.execute(insert(table), batch)
+
+def _drop_search_index(connection, table) -> bool:
+    """Stop per-row maintenance of the items full-text index during a load"""
+    if table.name != item_model.Item.__tablename__:
+        return False
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TRIGGER IF EXISTS items_fts_ai"))
+        return True
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("DROP INDEX IF EXISTS ix_items_search"))
+        return True
+    return False
+
+def _restore_search_index(connection) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(SEARCH_DDL["sqlite"][1]))
+        connection.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+    else:
+        for statement in SEARCH_DDL["postgresql"]:
+            connection.execute(text(statement))
+
+def _drop_stats_triggers(connection, table) -> bool:
+    """Stop per-row maintenance of the item stats during a load"""
+    if table.name != item_model.Item.__tablename__ or connection.dialect.name not in STATS_TRIGGERS:
+        return False
+    for statement in STATS_TRIGGERS[connection.dialect.name]:
+        connection.execute(text(statement))
+    return True
+
+def _restore_stats_triggers(connection) -> None:
+    # Recreates the dropped triggers and recounts every row, loaded ones included
+    for statement in STATS_DDL[connection.dialect.name] + STATS_REBUILD:
+        connection.execute(text(statement))
+
+def bulk_load(db_engine: Engine, table, rows: Iterator[Dict], count: int, batch_size: int, progress=None) -> int:
+    """Insert `count` rows in one transaction, `batch_size` rows at a time.
+    When the load at least doubles the table, its secondary indexes (and the
+    items search index and stats triggers) are dropped first and rebuilt at
+    the end: building an index once is much cheaper than updating it row by
+    row."""
+    loaded = 0
+    with db_engine.begin() as connection:
+        existing = connection.execute(select(func.count()).select_from(table)).scalar()
+        deferred = list(table.indexes) if count and count >= existing else []
+        for index in deferred:
+            index.drop(connection)
+        search_dropped = _drop_search_index(connection, table) if deferred else False
+        stats_dropped = _drop_stats_triggers(connection, table) if deferred else False
+        for batch in _batches(rows, batch_size):
+            _write_batch(connection, table, batch)
+            loaded += len(batch)
+            if progress:
+                progress(table.name, loaded)
+        for index in deferred:
+            index.create(connection)
+        if search_dropped:
+            _restore_search_index(connection)
+        if stats_dropped:
+            _restore_stats_triggers(connection)
+    return loaded
+
+def populate(
+    user_count: int,
+    item_count: int,
+    seed: int = 0,
+    batch_size: int = 50_000,
+    password: Optional[str] = "password123",
+    hash_workers: int = 0,
+    until: datetime = DEFAULT_UNTIL,
+    db_engine: Engine = engine,
+    progress=None,
+) -> Dict[str, float]:
+    """Add synthetic users and items. With `password`, every user shares its
+    one bcrypt hash; with password=None each user gets their own password
+    (see synthetic_password), hashed across `hash_workers` processes."""
+    timings: Dict[str, float] = {}
+    with db_engine.connect() as connection:
+        start = connection.execute(select(func.coalesce(func.max(user_model.User.id), 0))).scalar()
+
+    started = time.perf_counter()
+    if user_count and password is not None:
+        hashes = [pwd_context.hash(password)]
+    elif user_count:
+        usernames = [f"user{start + offset + 1:07d}" for offset in range(user_count)]
+        hashes = hash_passwords([synthetic_password(name) for name in usernames], hash_workers or os.cpu_count() or 1)
+    else:
+        hashes = []
+    timings["hash_seconds"] = time.perf_counter() - started
+
+    # Independent streams, so the items do not change with the user count
+    started = time.perf_counter()
+    user_rows = generate_users(random.Random(f"{seed}-users"), user_count, start, hashes, until)
+    timings["users"] = bulk_load(db_engine, user_model.User.__table__, user_rows, user_count, batch_size, progress)
+    timings["users_seconds"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    item_rows = generate_items(random.Random(f"{seed}-items"), item_count, until)
+    timings["items"] = bulk_load(db_engine, item_model.Item.__table__, item_rows, item_count, batch_size, progress)
+    timings["items_seconds"] = time.perf_counter() - started
+    return timings
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Create the tables and seed sample or synthetic data")
+    parser.add_argument("--users", type=int, default=0, help="synthetic users to add")
+    parser.add_argument("--items", type=int, default=0, help="synthetic items to add")
+    parser.add_argument("--seed", type=int, default=0, help="same seed, same rows")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--password", default="password123", help="password shared by every synthetic user")
+    parser.add_argument("--unique-passwords", action="store_true",
+                        help="give each user the password '<username>-password', hashed in parallel (slow: bcrypt per user)")
+    parser.add_argument("--hash-workers", type=int, default=0, help="processes for --unique-passwords (default: CPU count)")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=DEFAULT_UNTIL,
+                        help="latest generated timestamp (ISO 8601); timestamps cover the two years before it")
+    parser.add_argument("--no-sample", action="store_true", help="skip the demo items and accounts")
+    args = parser.parse_args(argv)
+
     # Create tables
     user_model.Base.metadata.create_all(bind=engine)
     item_model.Base.metadata.create_all(bind=engine)
-    # Initialize with sample data
-    init_db() 
\ No newline at end of file
+    if not args.no_sample:
+        # Initialize with sample data
+        init_db()
+    if not (args.users or args.items):
+        return
+
+    def progress(table: str, rows: int) -> None:
+        print(f"{table}: {rows} rows", file=sys.stderr)
+
+    until = args.until if args.until.tzinfo else args.until.replace(tzinfo=timezone.utc)
+    timings = populate(
+        args.users, args.items, args.seed, args.batch_size,
+        password=None if args.unique_passwords else args.password,
+        hash_workers=args.hash_workers, until=until, progress=progress,
+    )
+    print(
+        f"Added {timings['users']} users in {timings['hash_seconds'] + timings['users_seconds']:.1f}s "
+        f"(hashing {timings['hash_seconds']:.1f}s) and {timings['items']} items in {timings['items_seconds']:.1f}s"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.settings import settings
+from app.db.database import LazySession, SessionLocal, create_db_engine, session_counters
+
+logger = logging.getLogger(__name__)
+
+# Cookie holding the time (epoch seconds) until which a client reads from the primary
+STICKY_COOKIE = "read_primary_until"
+
+# Per-request record of committed writes, installed by ReadYourWritesMiddleware.
+# The dict is shared with the threadpool copies of the request context.
+request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+@event.listens_for(Session, "after_commit")
+def _note_write(session: Session) -> None:
+    writes = request_writes.get()
+    if writes is not None:
+        writes["committed"] = True
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = make_url(url)
+        self.name = self.url.render_as_string(hide_password=True)
+        self.engine = create_db_engine(self.url, label=f"replica:{self.name}", pool_pre_ping=True)
+        # Sessions carry info["replica"] so callers can tell a possibly lagging read
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine, info={"replica": self.name})
+        self.in_flight = 0
+        self.healthy = True
+
+    def probe(self) -> bool:
+        try:
+            with self.engine.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
+            return True
+        except SQLAlchemyError:
+            return False
+
+class ReadRouter:
+    """Spreads read sessions over the healthy replicas (round robin or fewest
+    sessions in flight) and falls back to the primary when none is healthy"""
+
+    def __init__(self, urls: List[str], strategy: str = "round_robin", health_interval: float = 10.0):
+        if strategy not in ("round_robin", "least_loaded"):
+            raise ValueError(f"Unknown replica strategy {strategy!r}")
+        self.replicas = [Replica(url) for url in urls]
+        self.strategy = strategy
+        self.health_interval = health_interval
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def choose(self) -> Optional[Replica]:
+        candidates = [replica for replica in self.replicas if replica.healthy]
+        if not candidates:
+            return None
+        if self.strategy == "least_loaded":
+            return min(candidates, key=lambda replica: replica.in_flight)
+        return candidates[next(self._counter) % len(candidates)]
+
+    @contextmanager
+    def session(self, prefer_primary: bool = False) -> Iterator[Session]:
+        """A lazy session; the replica is picked when it is first used"""
+        replica: Optional[Replica] = None
+
+        def open_session() -> Session:
+            nonlocal replica
+            replica = None if prefer_primary else self.choose()
+            if replica is None:
+                return SessionLocal()
+            with self._lock:
+                replica.in_flight += 1
+            return replica.Session()
+
+        db = LazySession(open_session)
+        try:
+            yield db
+        except DBAPIError as exc:
+            if replica is not None and (exc.connection_invalidated or isinstance(exc, OperationalError)):
+                # Stop routing here until the health check sees it answer again
+                self.mark_unhealthy(replica)
+            raise
+        finally:
+            db.close()
+            if replica is not None:
+                with self._lock:
+                    replica.in_flight -= 1
+
+    def mark_unhealthy(self, replica: Replica) -> None:
+        if replica.healthy:
+            logger.warning("Read replica %s failed; reading from the primary until it recovers", replica.name)
+        replica.healthy = False
+
+    def check_health(self) -> None:
+        for replica in self.replicas:
+            if not replica.probe():
+                self.mark_unhealthy(replica)
+            elif not replica.healthy:
+                logger.warning("Read replica %s is healthy again", replica.name)
+                replica.healthy = True
+
+    def start_health_checks(self) -> None:
+        """Probe every replica in a background thread, so requests never wait on a dead host"""
+        if not self.replicas or self._health_thread is not None:
+            return
+        self.check_health()
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(self.health_interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, name="replica-health", daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self) -> None:
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+            self._health_thread = None
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+read_router = ReadRouter(
+    settings.database_replica_urls,
+    strategy=settings.database_replica_strategy,
+    health_interval=settings.database_replica_health_interval_seconds,
+)
+
+def reads_from_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough that a replica might not show it yet"""
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_session(request: Request):
+    """Context manager over a session for read-only work on behalf of `request`"""
+    return read_router.session(prefer_primary=reads_from_primary(request))
+
+# Dependency to get a read-only database session (a replica when configured)
+def get_read_db(request: Request):
+    session_counters.count("provided")
+    with read_session(request) as db:
+        yield db
@@ -1,21 +1,65 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.core.settings import settings
-from app.api.routes import items,users,auth,register
+from app.core.security import HashingBusy, shutdown_hash_executor
+from app.core.changes import item_changes
+from app.db.database import async_engine, describe_engine, session_counters
+from app.db.replicas import read_router
+from app.core.middleware import MetricsMiddleware, ReadYourWritesMiddleware
+from app.core.profiling import ProfilingMiddleware, profile_threadpool_endpoints
+from app.core.admission import AdmissionMiddleware, admission_gates
+from app.api.routes import items,users,auth,register,metrics
+
+# uvicorn's logger, so startup lines show up with its default logging config
+logger = logging.getLogger("uvicorn.error")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Database engine: %s", describe_engine())
+    if read_router.replicas:
+        logger.info("Read replicas (%s): %s", read_router.strategy, ", ".join(replica.name for replica in read_router.replicas))
+        read_router.start_health_checks()
+    item_changes.start()
+    yield
+    logger.info(
+        "Database sessions: %d provided to handlers, %d opened",
+        session_counters.provided, session_counters.opened,
+    )
+    item_changes.stop()
+    read_router.stop_health_checks()
+    read_router.dispose()
+    shutdown_hash_executor()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Create the FastAPI application
 app = FastAPI(
     title=settings.project_name,
     version=settings.version,
     description=settings.description,
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan
 )
 
+@app.exception_handler(HashingBusy)
+async def hashing_busy_handler(request: Request, exc: HashingBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 app.include_router(users.router)
 app.include_router(items.router)
 app.include_router(auth.router)
 app.include_router(register.router)
+if settings.metrics_enabled:
+    app.include_router(metrics.router)
+
+# Inside CORS, so shed responses still carry CORS headers a browser can read
+if settings.admission_control_enabled:
+    app.add_middleware(AdmissionMiddleware, gates=admission_gates, retry_after=settings.admission_retry_after_seconds)
 
 # CORS Configuration
 app.add_middleware(
@@ -24,8 +68,24 @@ app.add_middleware(
     allow_credentials=settings.cors_allow_credentials,
     allow_methods=settings.cors_allow_methods,
     allow_headers=settings.cors_allow_headers,
+    expose_headers=settings.cors_expose_headers,
 )
 
+if settings.profiling_enabled:
+    profile_threadpool_endpoints(app)
+    app.add_middleware(
+        ProfilingMiddleware,
+        output_dir=settings.profiling_output_dir,
+        sample_rate=settings.profiling_sample_rate,
+    )
+
+if read_router.replicas:
+    app.add_middleware(ReadYourWritesMiddleware, window=settings.database_read_after_write_seconds)
+
+# Outermost, so the recorded latency covers every other middleware
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Run the application if it is called directly
 if __name__ == "__main__":
     import uvicorn
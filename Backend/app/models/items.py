@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime
+from sqlalchemy import DDL, Column, Index, Integer, String, Float, Boolean, DateTime, column, event, table
 from sqlalchemy.sql import func
-from app.db.database import Base
+from app.db.database import Base, utcnow
 
 class Item(Base):
     __tablename__ = "items"
@@ -11,5 +11,122 @@ class Item(Base):
     price = Column(Float, nullable=False)
     is_available = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=utcnow)
 
+    # Composite indexes behind the GET /items/ filters (see app.crud.items.item_filter_clauses)
+    __table_args__ = (
+        Index("ix_items_is_available_price", "is_available", "price"),
+        Index("ix_items_price_id", "price", "id"),
+        Index("ix_items_created_at_id", "created_at", "id"),
+        Index("ix_items_updated_at_id", "updated_at", "id"),
+    )
+
+
+# Full-text search over name and description (see app.crud.items.search_items).
+# SQLite: an FTS5 index over the items table kept in sync by triggers.
+# PostgreSQL: a GIN index on the weighted tsvector expression the search uses.
+SEARCH_VECTOR_PG = (
+    "setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+        "name, description, content='items', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN "
+        "INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF name, description ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    ],
+    "postgresql": [
+        f"CREATE INDEX IF NOT EXISTS ix_items_search ON items USING GIN (({SEARCH_VECTOR_PG}))",
+    ],
+}
+
+for _dialect, _statements in SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Item.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+
+
+# Running totals behind GET /items/stats and X-Total-Count (see
+# app.crud.items.get_item_stats). Triggers update them in the transaction of
+# every insert, update and delete of items, whichever code path made it.
+# Rows are spread over STATS_SHARDS rows by id so that concurrent writers on
+# PostgreSQL rarely wait on the same row lock; readers sum the shards.
+# Min and max price come from the ends of ix_items_price_id instead.
+STATS_SHARDS = 16
+_SHARD = f"& {STATS_SHARDS - 1}"
+
+item_stats = table(
+    "item_stats",
+    column("shard", Integer),
+    column("item_count", Integer),
+    column("available_count", Integer),
+    column("price_sum", Float),
+)
+
+def _stats_delta(sign: str, row: str) -> str:
+    return (
+        f"item_count = item_count {sign} 1, "
+        f"available_count = available_count {sign} CASE WHEN {row}.is_available THEN 1 ELSE 0 END, "
+        f"price_sum = price_sum {sign} {row}.price"
+    )
+
+_STATS_UPDATE = (
+    "available_count = available_count + (CASE WHEN new.is_available THEN 1 ELSE 0 END) "
+    "- (CASE WHEN old.is_available THEN 1 ELSE 0 END), price_sum = price_sum + new.price - old.price"
+)
+
+STATS_DDL = {
+    "sqlite": [
+        "CREATE TABLE IF NOT EXISTS item_stats (shard INTEGER PRIMARY KEY, item_count INTEGER NOT NULL, "
+        "available_count INTEGER NOT NULL, price_sum REAL NOT NULL)",
+        "CREATE TRIGGER IF NOT EXISTS items_stats_ai AFTER INSERT ON items BEGIN "
+        f"UPDATE item_stats SET {_stats_delta('+', 'new')} WHERE shard = new.id {_SHARD}; END",
+        "CREATE TRIGGER IF NOT EXISTS items_stats_ad AFTER DELETE ON items BEGIN "
+        f"UPDATE item_stats SET {_stats_delta('-', 'old')} WHERE shard = old.id {_SHARD}; END",
+        "CREATE TRIGGER IF NOT EXISTS items_stats_au AFTER UPDATE OF price, is_available ON items BEGIN "
+        f"UPDATE item_stats SET {_STATS_UPDATE} WHERE shard = new.id {_SHARD}; END",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS item_stats (shard INTEGER PRIMARY KEY, item_count BIGINT NOT NULL, "
+        "available_count BIGINT NOT NULL, price_sum DOUBLE PRECISION NOT NULL)",
+        "CREATE OR REPLACE FUNCTION items_stats_apply() RETURNS trigger AS $$ BEGIN "
+        f"IF TG_OP = 'INSERT' THEN UPDATE item_stats SET {_stats_delta('+', 'NEW')} WHERE shard = NEW.id {_SHARD}; "
+        f"ELSIF TG_OP = 'DELETE' THEN UPDATE item_stats SET {_stats_delta('-', 'OLD')} WHERE shard = OLD.id {_SHARD}; "
+        f"ELSE UPDATE item_stats SET {_STATS_UPDATE} WHERE shard = NEW.id {_SHARD}; "
+        "END IF; RETURN NULL; END $$ LANGUAGE plpgsql",
+        "DROP TRIGGER IF EXISTS items_stats ON items",
+        "CREATE TRIGGER items_stats AFTER INSERT OR DELETE OR UPDATE OF price, is_available ON items "
+        "FOR EACH ROW EXECUTE FUNCTION items_stats_apply()",
+    ],
+}
+
+STATS_TRIGGERS = {
+    "sqlite": ["DROP TRIGGER IF EXISTS items_stats_ai", "DROP TRIGGER IF EXISTS items_stats_ad", "DROP TRIGGER IF EXISTS items_stats_au"],
+    "postgresql": ["DROP TRIGGER IF EXISTS items_stats ON items"],
+}
+
+# Recompute every shard from items. Run after creating the table and whenever
+# the triggers were off (bulk loads) or the totals are found to have drifted.
+_SHARD_IDS = " UNION ALL ".join(f"SELECT {shard} AS shard" for shard in range(STATS_SHARDS))
+STATS_REBUILD = [
+    "DELETE FROM item_stats",
+    "INSERT INTO item_stats (shard, item_count, available_count, price_sum) "
+    "SELECT shards.shard, COALESCE(totals.item_count, 0), COALESCE(totals.available_count, 0), COALESCE(totals.price_sum, 0) "
+    f"FROM ({_SHARD_IDS}) AS shards LEFT JOIN ("
+    f"SELECT id {_SHARD} AS shard, COUNT(*) AS item_count, "
+    "SUM(CASE WHEN is_available THEN 1 ELSE 0 END) AS available_count, SUM(price) AS price_sum "
+    f"FROM items GROUP BY id {_SHARD}"
+    ") AS totals ON totals.shard = shards.shard",
+]
+
+for _dialect, _statements in STATS_DDL.items():
+    for _statement in _statements + STATS_REBUILD:
+        event.listen(Item.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+    event.listen(Item.__table__, "after_drop", DDL("DROP TABLE IF EXISTS item_stats").execute_if(dialect=_dialect))
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime, timezone
+from typing import List
 
 # Item schemas
 class ItemBase(BaseModel):
@@ -24,3 +25,72 @@ class Item(ItemBase):
     
     class Config:
         from_attributes = True
+
+# Filter schemas
+class ItemFilters(BaseModel):
+    """Query filters for item listings; unset fields do not filter"""
+    min_price: float | None = Field(None, ge=0)
+    max_price: float | None = Field(None, ge=0)
+    is_available: bool | None = None
+    name_prefix: str | None = Field(None, min_length=1, description="Case-sensitive name prefix")
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    updated_after: datetime | None = None
+    updated_before: datetime | None = None
+
+    @field_validator("created_after", "created_before", "updated_after", "updated_before")
+    @classmethod
+    def as_utc(cls, value: datetime | None) -> datetime | None:
+        # Timestamps are stored in UTC; naive values are taken to be UTC already
+        if value is None:
+            return None
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+# Bulk operation schemas
+class ItemBulkUpdate(ItemUpdate):
+    id: int = Field(..., gt=0)
+
+class ItemBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+class ItemLookup(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+class ItemLookupResponse(BaseModel):
+    items: List[Item]
+    missing: List[int]
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: int | None = None
+    status: str = Field(..., description="created, updated, deleted, not_found, invalid, failed or rolled_back")
+    error: str | None = None
+
+class BulkItemResponse(BaseModel):
+    mode: str
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+# Stats schemas
+class ItemStats(BaseModel):
+    count: int
+    available_count: int
+    min_price: float | None = None
+    max_price: float | None = None
+    avg_price: float | None = None
+
+# Import schemas
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    rows_read: int
+    rows_imported: int
+    rows_failed: int
+    checkpoint_line: int = Field(..., description="Last input line committed; pass it back as start_line to resume")
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+from typing import List
 
 # User schemas
 class UserBase(BaseModel):
@@ -25,6 +26,13 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class UserLookup(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+class UserLookupResponse(BaseModel):
+    users: List[User]
+    missing: List[int]
+
 class UserInDB(User):
     hashed_password: str
 
@@ -34,4 +42,14 @@ class Token(BaseModel):
     token_type: str
 
 class TokenData(BaseModel):
-    username: str | None = None 
\ No newline at end of file
+    username: str | None = None
+
+class Principal(BaseModel):
+    """The authenticated caller, as carried in the token or the principal cache"""
+    id: int
+    username: str
+    is_active: bool
+    token_version: int = 0
+
+    class Config:
+        from_attributes = True 
\ No newline at end of file
@@ -0,0 +1,275 @@
+"""Load test of the HTTP API against a seeded database.
+
+    python benchmarks/api_load.py --users 100 --items 10000 --concurrency 1,8,32 --output run.json
+    python benchmarks/api_load.py ... --compare baseline.json --threshold 10
+
+Seeds a fresh database (a temporary SQLite file unless --database-url is
+given), then drives each scenario at each concurrency level, either
+in-process through httpx's ASGI transport (the default) or against a local
+uvicorn worker (--transport uvicorn). Every scenario/level pair reports
+latency percentiles, requests per second, rows written per second and SQL
+statements per request, the last taken from the server's /metrics, as JSON.
+bulk_create_items sends --bulk-size items per POST /items/bulk, so its
+rows_per_second compares directly with create_item's.
+
+--database-async turns on the async engine (DATABASE_ASYNC=true): login,
+the auth dependency and the item and user routes then run their queries on
+AsyncSession (app.crud.async_items, app.crud.async_users) instead of the
+sync session in the threadpool. Compare a run with it against one without,
+covering item reads and writes as well as login and /users/me, for example
+
+    python benchmarks/api_load.py --scenarios login,users_me,list_items,get_item,create_item,update_item --concurrency 32,128 --output sync.json
+    python benchmarks/api_load.py --scenarios login,users_me,list_items,get_item,create_item,update_item --concurrency 32,128 --database-async --compare sync.json
+
+With --compare, the run is checked against an earlier output file and the
+exit status is 1 when a p95 latency rose, or a throughput fell, by more
+than --threshold percent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import summarize
+
+SCENARIOS = ["login", "list_items", "get_item", "create_item", "bulk_create_items", "update_item", "users_me", "get_user"]
+PASSWORD = "benchmark-password"
+
+_DB_QUERIES = re.compile(r'^http_request_db_queries_(sum|count)\{method="[^"]*",route="([^"]*)"\} (\S+)$', re.M)
+
+def seed(database_url, users, items, rng, chunk=5000):
+    """Create the schema and fill it; every user shares one password hash"""
+    from sqlalchemy import insert
+    from app.core.security import pwd_context
+    from app.db.database import Base, SessionLocal, engine
+    from app.models import items as item_models, users as user_models
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    hashed = pwd_context.hash(PASSWORD)
+    with SessionLocal() as db:
+        db.execute(insert(user_models.User), [
+            {"username": f"bench{i}", "email": f"bench{i}@example.com", "full_name": f"Bench User {i}", "hashed_password": hashed}
+            for i in range(users)
+        ])
+        for start in range(0, items, chunk):
+            db.execute(insert(item_models.Item), [
+                {"name": f"item {start + offset}", "description": "seeded", "price": round(rng.uniform(1, 500), 2), "is_available": rng.random() < 0.8}
+                for offset in range(min(chunk, items - start))
+            ])
+        db.commit()
+
+def db_queries(metrics_text):
+    """Total (statements, requests) over every route but /metrics itself"""
+    totals = {"sum": 0.0, "count": 0.0}
+    for kind, route, value in _DB_QUERIES.findall(metrics_text):
+        if route != "/metrics":
+            totals[kind] += float(value)
+    return totals["sum"], totals["count"]
+
+class Scenario:
+    """Builds the requests of one scenario; `tokens` are bearer tokens of
+    seeded users, handed out to workers in turn"""
+
+    def __init__(self, name, users, items, tokens, rng, bulk_size=100):
+        self.name = name
+        self.users = users
+        self.items = items
+        self.tokens = tokens
+        self.rng = rng
+        self.bulk_size = bulk_size
+        # Items written per request, for rows_per_second
+        self.rows = bulk_size if name == "bulk_create_items" else 1
+
+    def auth(self, worker):
+        return {"Authorization": f"Bearer {self.tokens[worker % len(self.tokens)]}"}
+
+    async def send(self, client, worker):
+        rng = self.rng
+        if self.name == "login":
+            user = rng.randrange(self.users)
+            return await client.post("/token/", data={"username": f"bench{user}", "password": PASSWORD})
+        if self.name == "list_items":
+            return await client.get("/items/", params={"skip": rng.randrange(max(1, self.items - 20)), "limit": 20})
+        if self.name == "get_item":
+            return await client.get(f"/items/{rng.randrange(1, self.items + 1)}")
+        if self.name == "create_item":
+            return await client.post("/items/", json={"name": f"load {rng.random()}", "price": 9.99}, headers=self.auth(worker))
+        if self.name == "bulk_create_items":
+            rows = [{"name": f"load {rng.random()}", "price": 9.99} for _ in range(self.bulk_size)]
+            return await client.post("/items/bulk", json=rows, headers=self.auth(worker))
+        if self.name == "update_item":
+            return await client.put(f"/items/{rng.randrange(1, self.items + 1)}", json={"price": round(rng.uniform(1, 500), 2)}, headers=self.auth(worker))
+        if self.name == "users_me":
+            return await client.get("/users/me", headers=self.auth(worker))
+        if self.name == "get_user":
+            return await client.get(f"/users/{rng.randrange(1, self.users + 1)}", headers=self.auth(worker))
+        raise ValueError(f"Unknown scenario {self.name!r}")
+
+async def run_level(client, scenario, concurrency, requests):
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker(index):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await scenario.send(client, index)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    before = db_queries((await client.get("/metrics")).text)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = db_queries((await client.get("/metrics")).text)
+    handled = after[1] - before[1]
+    return {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        **summarize(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "rows_per_second": round(len(latencies) * scenario.rows / elapsed, 1),
+        "db_queries_per_request": round((after[0] - before[0]) / handled, 2) if handled else None,
+    }
+
+async def login_all(client, count):
+    tokens = []
+    for user in range(count):
+        response = await client.post("/token/", data={"username": f"bench{user}", "password": PASSWORD})
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+async def _wait_for(client, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            await client.get("/metrics")
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+async def run(args):
+    import httpx
+
+    rng = random.Random(args.seed)
+    process = None
+    if args.transport == "uvicorn":
+        port = _free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=os.environ.copy(),
+        )
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60)
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    results = []
+    try:
+        if process is not None:
+            await _wait_for(client, process)
+        tokens = await login_all(client, min(args.users, max(args.concurrency)))
+        for name in args.scenarios:
+            scenario = Scenario(name, args.users, args.items, tokens, rng, args.bulk_size)
+            for concurrency in args.concurrency:
+                result = await run_level(client, scenario, concurrency, args.requests)
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+    finally:
+        await client.aclose()
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        else:
+            # No lifespan runs under the ASGI transport; pooled aiosqlite
+            # connections would keep their threads, and the process, alive
+            from app.db.database import async_engine
+            if async_engine is not None:
+                await async_engine.dispose()
+    return results
+
+def compare(results, baseline, threshold):
+    """Regressions of p95 latency or throughput beyond `threshold` percent"""
+    previous = {(row["scenario"], row["concurrency"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = previous.get((row["scenario"], row["concurrency"]))
+        if old is None:
+            continue
+        if old["p95_ms"] and row["p95_ms"] > old["p95_ms"] * (1 + threshold / 100):
+            regressions.append({"scenario": row["scenario"], "concurrency": row["concurrency"], "metric": "p95_ms", "baseline": old["p95_ms"], "current": row["p95_ms"]})
+        if old["rps"] and row["rps"] < old["rps"] * (1 - threshold / 100):
+            regressions.append({"scenario": row["scenario"], "concurrency": row["concurrency"], "metric": "rps", "baseline": old["rps"], "current": row["rps"]})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=lambda text: [int(level) for level in text.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and concurrency level")
+    parser.add_argument("--scenarios", type=lambda text: text.split(","), default=SCENARIOS)
+    parser.add_argument("--bulk-size", type=int, default=100, help="items per bulk_create_items request")
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--database-async", action="store_true", help="serve login and the item and user routes from the async engine")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS for the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--compare", help="earlier report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/api_load.db"
+    os.environ["METRICS_ENABLED"] = "true"
+    os.environ["DATABASE_ASYNC"] = str(args.database_async).lower()
+    # Closed-loop latency per concurrency level; shedding is measured by overload.py
+    os.environ.setdefault("ADMISSION_CONTROL_ENABLED", "false")
+    if args.bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    seed(os.environ["DATABASE_URL"], args.users, args.items, random.Random(args.seed))
+
+    report = {
+        "config": {key: getattr(args, key) for key in ("users", "items", "concurrency", "requests", "bulk_size", "transport", "database_async", "bcrypt_rounds", "seed")},
+        "python": sys.version.split()[0],
+        "results": asyncio.run(run(args)),
+    }
+    if args.compare:
+        with open(args.compare) as baseline:
+            report["regressions"] = compare(report["results"], json.load(baseline), args.threshold)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    if report.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
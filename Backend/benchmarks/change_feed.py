@@ -0,0 +1,77 @@
+"""Cost of idle GET /items/changes subscribers and of fanning an event out.
+
+    python benchmarks/change_feed.py --subscribers 5000 --events 20
+
+Opens the given number of subscriber streams on an in-process ChangeFeed
+(no HTTP, so only the feed's own cost is measured), reports the memory held
+per idle subscriber, then publishes events from a worker thread, as crud
+does, and times how long until every subscriber has received each one.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import tracemalloc
+
+from common import summarize
+
+async def run(subscribers, events):
+    from app.core.changes import ChangeFeed, MemoryBroker
+
+    feed = ChangeFeed(MemoryBroker(), capacity=1000, keepalive=3600, max_stream_seconds=3600)
+    feed.start()
+    received = [0] * subscribers
+    all_received = asyncio.Event()
+    target = 0
+    pending = subscribers
+
+    async def subscriber(index):
+        nonlocal pending
+        stream = feed.stream()
+        async for frame in stream:
+            if frame.startswith(b"id: ") and b"event: ready" not in frame:
+                received[index] += frame.count(b"\n\n")
+                if received[index] >= target:
+                    pending -= 1
+                    if pending == 0:
+                        all_received.set()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tasks = [asyncio.ensure_future(subscriber(index)) for index in range(subscribers)]
+    await asyncio.sleep(0.5)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    idle_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    latencies = []
+    for number in range(1, events + 1):
+        target, pending = number, subscribers
+        all_received.clear()
+        started = time.perf_counter()
+        publisher = threading.Thread(target=feed.publish, args=([("updated", number, b'{"id":%d}' % number)],))
+        publisher.start()
+        await all_received.wait()
+        latencies.append(time.perf_counter() - started)
+        publisher.join()
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        "subscribers": subscribers,
+        "idle_bytes_per_subscriber": round(idle_bytes / subscribers),
+        "fan_out": summarize(latencies),
+        "fan_out_us_per_subscriber": round(min(latencies) / subscribers * 1e6, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.subscribers, args.events)), indent=2))
+
+if __name__ == "__main__":
+    main()
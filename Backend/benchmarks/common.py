@@ -0,0 +1,23 @@
+"""Helpers shared by the benchmark scripts"""
+import os
+import statistics
+import sys
+
+# Make `app` importable when a script is run as `python benchmarks/<name>.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize(samples):
+    """Latency percentiles in milliseconds for a list of durations in seconds"""
+    if not samples:
+        return {"runs": 0}
+    return {
+        "runs": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+    }
@@ -0,0 +1,97 @@
+"""Concurrent reads and writes against SQLite under each engine profile.
+
+    python benchmarks/db_concurrency.py --readers 8 --writers 2 --seconds 10
+
+Each profile gets a fresh database file seeded with --items rows. Reader
+threads fetch single items and pages while writer threads update random
+items. The report gives throughput, latency percentiles and "database is
+locked" failures per profile, as JSON.
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+
+from common import summarize
+
+def run_profile(profile, args):
+    from sqlalchemy import insert, select, update
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+    from app.db.database import Base, create_db_engine
+    from app.models import items as models, users  # noqa: F401
+
+    url = make_url(f"sqlite:///{tempfile.mkdtemp()}/concurrency.db")
+    engine = create_db_engine(url, profile, pool_size=args.readers + args.writers, max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.execute(insert(models.Item), [
+            {"name": f"item {i}", "description": "seeded", "price": 1 + i % 500, "is_available": True}
+            for i in range(args.items)
+        ])
+        db.commit()
+
+    deadline = time.perf_counter() + args.seconds
+    results = {"read": [], "write": [], "errors": 0}
+    lock = threading.Lock()
+
+    def worker(kind, seed):
+        rng = random.Random(seed)
+        samples, errors = [], 0
+        with Session() as db:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    if kind == "write":
+                        db.execute(update(models.Item).where(models.Item.id == rng.randint(1, args.items)).values(price=rng.uniform(1, 500)))
+                        db.commit()
+                    elif rng.random() < 0.5:
+                        db.get(models.Item, rng.randint(1, args.items))
+                        db.rollback()
+                    else:
+                        start = rng.randint(1, max(1, args.items - 20))
+                        db.scalars(select(models.Item).where(models.Item.id >= start).order_by(models.Item.id).limit(20)).all()
+                        db.rollback()
+                    samples.append(time.perf_counter() - started)
+                except OperationalError:
+                    db.rollback()
+                    errors += 1
+        with lock:
+            results[kind] += samples
+            results["errors"] += errors
+
+    threads = [threading.Thread(target=worker, args=("read", i)) for i in range(args.readers)]
+    threads += [threading.Thread(target=worker, args=("write", 1000 + i)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {
+        "reads_per_second": round(len(results["read"]) / args.seconds, 1),
+        "writes_per_second": round(len(results["write"]) / args.seconds, 1),
+        "read": summarize(results["read"]),
+        "write": summarize(results["write"]),
+        "locked_errors": results["errors"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", default="custom,sqlite-wal", help="comma-separated db profiles to compare")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--items", type=int, default=10000)
+    args = parser.parse_args()
+
+    report = {"readers": args.readers, "writers": args.writers, "seconds": args.seconds, "profiles": {}}
+    for profile in args.profiles.split(","):
+        report["profiles"][profile] = run_profile(profile, args)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
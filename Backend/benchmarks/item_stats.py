@@ -0,0 +1,94 @@
+"""GET /items/stats and X-Total-Count cost as the items table grows.
+
+    python benchmarks/item_stats.py --sizes 10000,100000,1000000
+
+Grows a fresh database (a temporary SQLite file unless --database-url is
+given) to each size with the init_db bulk loader, then times the stats read
+from the trigger-maintained item_stats shards next to the COUNT/SUM/MIN/MAX
+aggregate over items it replaces, and prints percentiles as JSON. At the
+largest size it also times single-row inserts with and without the stats
+triggers, which is what the running totals cost writers, after checking that
+the totals still match the items table.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from common import summarize
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=lambda text: [int(size) for size in text.split(",")], default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--runs", type=int, default=200, help="timed stats reads per size")
+    parser.add_argument("--aggregate-runs", type=int, default=5, help="timed full aggregates per size")
+    parser.add_argument("--inserts", type=int, default=2000, help="timed single-row inserts with and without the triggers")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/stats_bench.db"
+    from sqlalchemy import case, func, insert, select, text
+    from app.crud import items as crud_items
+    from app.db.database import Base, SessionLocal, engine
+    from app.db.init_db import populate
+    from app.models import items as models, users  # noqa: F401
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    aggregate = select(
+        func.count(),
+        func.sum(case((models.Item.is_available, 1), else_=0)),
+        func.min(models.Item.price),
+        func.max(models.Item.price),
+        func.avg(models.Item.price),
+    ).select_from(models.Item)
+
+    report = {"dialect": engine.dialect.name, "sizes": []}
+    loaded = 0
+    db = SessionLocal()
+    for size in sorted(args.sizes):
+        started = time.perf_counter()
+        populate(0, size - loaded, seed=args.seed + size)
+        seed_seconds = time.perf_counter() - started
+        loaded = size
+        db.rollback()
+        stats = crud_items.get_item_stats(db)
+        assert stats.count == size, (stats.count, size)
+        report["sizes"].append({
+            "items": size,
+            "seed_seconds": round(seed_seconds, 1),
+            "stats": summarize(timed(lambda: crud_items.get_item_stats(db), args.runs)),
+            "x_total_count": summarize(timed(lambda: crud_items.count_items(db), args.runs)),
+            "full_aggregate": summarize(timed(lambda: db.execute(aggregate).one(), args.aggregate_runs)),
+        })
+        db.rollback()
+
+    def insert_one():
+        db.execute(insert(models.Item), {"name": "stats bench", "price": 9.99, "is_available": True})
+        db.commit()
+
+    with_triggers = timed(insert_one, args.inserts)
+    report["drift"] = {name: list(values) for name, values in crud_items.check_item_stats(db).items()}
+    for statement in models.STATS_TRIGGERS.get(engine.dialect.name, []):
+        db.execute(text(statement))
+    db.commit()
+    without_triggers = timed(insert_one, args.inserts)
+    for statement in models.STATS_DDL.get(engine.dialect.name, []) + models.STATS_REBUILD:
+        db.execute(text(statement))
+    db.commit()
+    report["insert"] = {"with_stats_triggers": summarize(with_triggers), "without": summarize(without_triggers)}
+    db.close()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Cost of the /metrics instrumentation per request and per query.
+
+    python benchmarks/metrics_overhead.py --requests 200000 --queries 100000
+
+Drives a bare ASGI app with and without MetricsMiddleware (so routing and
+serialization stay out of the numbers), and runs `SELECT 1` on an in-memory
+SQLite engine with and without the statement listeners. Prints the added
+microseconds per request and per query as JSON. The two sides are timed in
+alternating rounds and the fastest round of each is kept, which damps
+scheduler noise.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import common  # noqa: F401  (puts the app on sys.path)
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+class _Route:
+    path = "/items/{item_id}"
+
+async def bare_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def drive(app, count):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(count):
+        await app({"type": "http", "method": "GET", "path": "/items/1"}, receive, send)
+    return time.perf_counter() - started
+
+def best_of(rounds, bare, timed):
+    """Fastest bare and instrumented timings over alternating rounds"""
+    bests = [float("inf"), float("inf")]
+    for _ in range(rounds):
+        bests[0] = min(bests[0], bare())
+        bests[1] = min(bests[1], timed())
+    return bests
+
+def request_overhead(count, rounds):
+    from app.core.middleware import MetricsMiddleware
+
+    instrumented = MetricsMiddleware(bare_app)
+    bare, timed = best_of(
+        rounds,
+        lambda: asyncio.run(drive(bare_app, count)),
+        lambda: asyncio.run(drive(instrumented, count)),
+    )
+    return (timed - bare) / count * 1e6
+
+def query_overhead(count, rounds):
+    from sqlalchemy import create_engine
+    from app.db.database import instrument_engine
+
+    def run(db_engine):
+        with db_engine.connect() as connection:
+            started = time.perf_counter()
+            for _ in range(count):
+                connection.exec_driver_sql("SELECT 1")
+            return time.perf_counter() - started
+
+    plain = create_engine("sqlite://")
+    instrumented = create_engine("sqlite://")
+    instrument_engine(instrumented, "bench")
+    bare, timed = best_of(rounds, lambda: run(plain), lambda: run(instrumented))
+    return (timed - bare) / count * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        "middleware_us_per_request": round(request_overhead(args.requests, args.rounds), 3),
+        "listeners_us_per_query": round(query_overhead(args.queries, args.rounds), 3),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
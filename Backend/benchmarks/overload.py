@@ -0,0 +1,193 @@
+"""Tail latency under overload, with and without admission control.
+
+    python benchmarks/overload.py --scenario list_items --duration 10 --factors 0.5,1,2
+
+Seeds a database as api_load.py does and measures the capacity of one
+uvicorn worker on the scenario with a closed loop. It then offers open-loop
+load at each factor of that capacity, once with
+ADMISSION_CONTROL_ENABLED=false and once with it on. Requests keep arriving
+on schedule however slowly the server answers, as real clients do. Each run
+reports, as JSON: latency percentiles of the successful responses, the
+number shed with 503, client-side timeouts and goodput.
+
+The load is sent over plain sockets with one connection per request,
+because an HTTP client library can cost as much CPU as the server and
+would be measured instead of it when both share the machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from api_load import PASSWORD, _free_port, seed
+from common import summarize
+
+SCENARIOS = ["list_items", "get_item", "create_item", "login"]
+
+def build_request(scenario, rng, args, token):
+    """(method, target, headers, body) of one request"""
+    if scenario == "list_items":
+        return "GET", f"/items/?skip={rng.randrange(max(1, args.items - 20))}&limit=20", {}, b""
+    if scenario == "get_item":
+        return "GET", f"/items/{rng.randrange(1, args.items + 1)}", {}, b""
+    if scenario == "create_item":
+        body = json.dumps({"name": f"load {rng.random()}", "price": 9.99}).encode()
+        return "POST", "/items/", {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}, body
+    body = urlencode({"username": f"bench{rng.randrange(args.users)}", "password": PASSWORD}).encode()
+    return "POST", "/token/", {"Content-Type": "application/x-www-form-urlencoded"}, body
+
+async def send(port, method, target, headers, body, timeout):
+    """Status of one request on a fresh connection, or None on timeout"""
+    lines = [f"{method} {target} HTTP/1.1", "Host: bench", "Connection: close", f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    payload = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+    async def exchange():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            writer.write(payload)
+            response = await reader.read()
+        finally:
+            writer.close()
+        return response
+
+    try:
+        response = await asyncio.wait_for(exchange(), timeout)
+    except (asyncio.TimeoutError, ConnectionError):
+        return None, b""
+    status_line, _, rest = response.partition(b"\r\n")
+    return int(status_line.split()[1]), rest.partition(b"\r\n\r\n")[2]
+
+async def closed_loop(port, requests, concurrency, timeout):
+    """Requests per second with `concurrency` clients back to back"""
+    remaining = len(requests)
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await send(port, *requests[remaining], timeout)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(requests) / (time.perf_counter() - started)
+
+async def open_loop(port, requests, rate, timeout):
+    """Start one request every 1/`rate` seconds, whether or not earlier ones finished"""
+    results = []
+
+    async def one(request):
+        started = time.perf_counter()
+        status, _ = await send(port, *request, timeout)
+        results.append((status, time.perf_counter() - started))
+
+    tasks = []
+    started = time.perf_counter()
+    for index, request in enumerate(requests):
+        delay = started + index / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(request)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    ok = [latency for status, latency in results if status is not None and status < 400]
+    return {
+        "offered_rps": round(rate, 1),
+        **summarize(ok),
+        "shed": sum(status == 503 for status, _ in results),
+        "timeouts": sum(status is None for status, _ in results),
+        "other_errors": sum(status is not None and status >= 400 and status != 503 for status, _ in results),
+        "goodput_rps": round(len(ok) / elapsed, 1),
+    }
+
+async def wait_for_server(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        status, _ = await send(port, "GET", "/metrics", {}, b"", 1.0)
+        if status is not None:
+            return
+        await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+async def against_server(args, admission, capacity=None):
+    port = _free_port()
+    env = dict(os.environ, ADMISSION_CONTROL_ENABLED=str(admission).lower())
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+    )
+    try:
+        await wait_for_server(port, process)
+        rng = random.Random(args.seed)
+        token = None
+        if args.scenario == "create_item":
+            _, body = await send(port, *build_request("login", rng, args, None), args.client_timeout)
+            token = json.loads(body)["access_token"]
+
+        def requests(count):
+            return [build_request(args.scenario, rng, args, token) for _ in range(count)]
+
+        if capacity is None:
+            capacity = await closed_loop(port, requests(args.capacity_requests), args.concurrency, args.client_timeout)
+        runs = []
+        for factor in args.factors:
+            rate = capacity * factor
+            run = await open_loop(port, requests(int(rate * args.duration)), rate, args.client_timeout)
+            run["factor"] = factor
+            print(json.dumps({"admission": admission, **run}), file=sys.stderr)
+            runs.append(run)
+            await asyncio.sleep(args.cooldown)
+        return capacity, runs
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+async def run(args):
+    capacity, without = await against_server(args, admission=False)
+    _, with_admission = await against_server(args, admission=True, capacity=capacity)
+    return {"capacity_rps": round(capacity, 1), "without_admission": without, "with_admission": with_admission}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, default="list_items")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--factors", type=lambda text: [float(factor) for factor in text.split(",")], default=[0.5, 1.0, 2.0])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per factor")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed-loop concurrency for measuring capacity")
+    parser.add_argument("--capacity-requests", type=int, default=1000)
+    parser.add_argument("--client-timeout", type=float, default=30.0)
+    parser.add_argument("--cooldown", type=float, default=2.0, help="pause between factors so queues drain")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS for the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/overload.db"
+    if args.bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    seed(os.environ["DATABASE_URL"], args.users, args.items, random.Random(args.seed))
+
+    report = {
+        "config": {key: getattr(args, key) for key in ("scenario", "users", "items", "factors", "duration", "concurrency", "bcrypt_rounds", "seed")},
+        **asyncio.run(run(args)),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Full-text search latency against a synthetic items table.
+
+    python benchmarks/search_latency.py --items 1000000
+
+Seeds a fresh database (a temporary SQLite file unless --database-url is
+given), then times GET /items/search's query for a set of terms next to the
+LIKE '%term%' scan it replaces, and prints percentiles as JSON. Ranking needs
+every match, so the LIKE baseline collects all matching ids rather than
+stopping at the first page.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from common import summarize
+
+ADJECTIVES = ["wireless", "ergonomic", "compact", "vintage", "portable", "premium", "rugged", "smart", "silent", "modular"]
+NOUNS = ["laptop", "keyboard", "mouse", "monitor", "lamp", "desk", "chair", "speaker", "camera", "charger", "router", "tablet"]
+PHRASES = ["for development", "with usb-c", "for gaming", "for the office", "with backlight", "for travel", "made of steel"]
+QUERIES = ["laptop", "wireless mouse", "lap", "ergo key", "portable speaker travel", "steel"]
+
+def seed(db, models, count, rng, chunk=10000):
+    from sqlalchemy import insert
+    started = time.perf_counter()
+    for start in range(0, count, chunk):
+        rows = [
+            {
+                "name": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {start + offset}",
+                "description": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(PHRASES)}",
+                "price": round(rng.uniform(1, 2000), 2),
+                "is_available": rng.random() < 0.8,
+            }
+            for offset in range(min(chunk, count - start))
+        ]
+        db.execute(insert(models.Item), rows)
+        db.commit()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=50, help="timed searches per query")
+    parser.add_argument("--like-runs", type=int, default=5, help="timed LIKE scans per query")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/search_bench.db"
+    from sqlalchemy import or_, select
+    from app.crud import items as crud_items
+    from app.db.database import Base, SessionLocal, engine
+    from app.models import items as models, users  # noqa: F401
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    rng = random.Random(args.seed)
+    report = {"dialect": engine.dialect.name, "items": args.items, "seed_seconds": round(seed(db, models, args.items, rng), 1), "queries": {}}
+
+    for q in QUERIES:
+        search = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            matches = crud_items.search_items(db, q, limit=args.limit)
+            search.append(time.perf_counter() - started)
+        # Second page through the keyset cursor
+        after = (matches[-1][1], matches[-1][0]) if matches else None
+        page2 = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            crud_items.search_items(db, q, limit=args.limit, after=after)
+            page2.append(time.perf_counter() - started)
+        like = []
+        terms = crud_items.search_terms(q)
+        for _ in range(args.like_runs):
+            started = time.perf_counter()
+            stmt = select(models.Item.id).where(*(
+                or_(models.Item.name.like(f"%{term}%"), models.Item.description.like(f"%{term}%")) for term in terms
+            ))
+            db.execute(stmt).all()
+            like.append(time.perf_counter() - started)
+        report["queries"][q] = {"search": summarize(search), "search_page_2": summarize(page2), "like_scan_all_matches": summarize(like)}
+
+    db.close()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
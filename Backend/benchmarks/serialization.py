@@ -0,0 +1,105 @@
+"""Serialization cost of one page of items.
+
+    python benchmarks/serialization.py --page-size 100 --runs 2000
+
+Fetches one page from an in-memory SQLite table and times each way of
+turning it into a response body: FastAPI's response_model path (validate
+every ORM row through List[schemas.Item], dump to JSON-able data, encode
+with json.dumps), per-item model_validate plus model_dump_json, column rows
+encoded directly with app.core.serialization.dumps, and the sparse id,name,price
+fieldset. Fetching ORM entities and plain column rows is timed as well.
+Prints microseconds per page as JSON, with the encoder in use (orjson when
+the "fast" extra is installed, the json module otherwise).
+"""
+import argparse
+import json
+import os
+import time
+
+import common  # noqa: F401  (puts the app on sys.path)
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+def best_us(fn, runs, rounds=5):
+    """Fastest of `rounds` timings of `runs` calls, in microseconds per call"""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best / runs * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine, insert, select
+    from sqlalchemy.orm import Session
+    from app.core import serialization
+    from app.crud import items as crud
+    from app.db.database import Base, utcnow
+    from app.models.items import Item
+    from app.schemas import items as schemas
+
+    db_engine = create_engine("sqlite://")
+    Base.metadata.create_all(db_engine)
+    with Session(db_engine) as db:
+        db.execute(insert(Item), [
+            {"name": f"item {i}", "description": "a seeded item description", "price": 1.25 + i, "is_available": i % 3 != 0, "updated_at": utcnow()}
+            for i in range(args.page_size)
+        ])
+        db.commit()
+
+        page = select(Item).order_by(Item.id).limit(args.page_size)
+        columns = select(*crud.EXPORT_COLUMNS).order_by(Item.id).limit(args.page_size)
+        db_items = list(db.scalars(page))
+        rows = db.execute(columns).all()
+        sparse = ["id", "name", "price"]
+        sparse_rows = db.execute(select(*serialization.field_columns(crud.ITEM_COLUMNS, sparse)).order_by(Item.id).limit(args.page_size)).all()
+        adapter = TypeAdapter(List[schemas.Item])
+
+        def response_model():
+            return json.dumps(adapter.dump_python(adapter.validate_python(db_items, from_attributes=True), mode="json")).encode()
+
+        def validate_each():
+            return crud.json_array(schemas.Item.model_validate(db_item).model_dump_json().encode() for db_item in db_items)
+
+        def column_rows():
+            return serialization.dumps([crud.item_record(row) for row in rows])
+
+        def sparse_page():
+            return serialization.dumps([dict(zip(sparse, row)) for row in sparse_rows])
+
+        assert json.loads(column_rows()) == json.loads(validate_each()) == json.loads(response_model())
+
+        def fetch_orm():
+            db.expunge_all()
+            return db.scalars(page).all()
+
+        results = {
+            "encoder": "orjson" if serialization.orjson is not None else "json",
+            "page_size": args.page_size,
+            "serialize_us": {
+                "response_model": round(best_us(response_model, args.runs), 1),
+                "model_validate_each": round(best_us(validate_each, args.runs), 1),
+                "column_rows": round(best_us(column_rows, args.runs), 1),
+                "sparse_id_name_price": round(best_us(sparse_page, args.runs), 1),
+            },
+            "fetch_us": {
+                "orm_entities": round(best_us(fetch_orm, args.runs // 10 or 1), 1),
+                "column_rows": round(best_us(lambda: db.execute(columns).all(), args.runs // 10 or 1), 1),
+            },
+            "bytes": {
+                "full": len(column_rows()),
+                "sparse_id_name_price": len(sparse_page()),
+            },
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
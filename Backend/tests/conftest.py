@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read once at import time, so the test database and a cheap
+# bcrypt cost have to be in place before anything from app is imported
+_tmpdir = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/test.db"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.db.database import Base, engine  # noqa: E402
+from app.models import items, users  # noqa: E402,F401
+
+Base.metadata.create_all(bind=engine)
+
+from app.main import app  # noqa: E402
+
+PASSWORD = "test-password"
+
+
+@pytest.fixture(scope="session")
+def database_dir():
+    return _tmpdir
+
+
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    client.post("/register/", json={"username": "tester", "email": "tester@example.com", "password": PASSWORD})
+    response = client.post("/token/", data={"username": "tester", "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,28 @@
+import pytest
+
+from app.core.admission import AdmissionMiddleware, request_class
+
+
+def _scope(method, path):
+    return {"type": "http", "method": method, "path": path}
+
+
+@pytest.mark.parametrize("method,path", [
+    ("GET", "/items/export"),
+    ("GET", "/users/export/"),
+    ("POST", "/items/import"),
+    ("GET", "/items/changes"),
+    ("GET", "/metrics"),
+])
+def test_streams_are_exempt(method, path):
+    assert request_class(_scope(method, path)) is None
+
+
+def test_request_classes():
+    assert request_class(_scope("GET", "/items/")) == "read"
+    assert request_class(_scope("PUT", "/items/1")) == "write"
+    assert request_class(_scope("POST", "/token/")) == "auth"
+
+
+def test_disabled_by_default(client):
+    assert all(middleware.cls is not AdmissionMiddleware for middleware in client.app.user_middleware)
@@ -0,0 +1,79 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The engines are built at import time from the settings, so each mode runs
+# the same walk through the item and user routes in a process of its own
+SCENARIO = """
+from fastapi.testclient import TestClient
+from app.core.changes import item_changes
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.models import items, users
+Base.metadata.create_all(bind=engine)
+from app.main import app
+
+published = []
+item_changes.publish = lambda changes: published.extend(kind for kind, _, _ in changes)
+
+def login(client, username, password):
+    response = client.post("/token/", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+client = TestClient(app)
+assert client.post("/register/", json={"username": "owner", "email": "owner@example.com", "password": "first-password"}).status_code == 201
+assert client.post("/register/", json={"username": "owner", "email": "other@example.com", "password": "first-password"}).json()["detail"] == "Username already taken"
+headers = login(client, "owner", "first-password")
+
+item = client.post("/items/", json={"name": "lamp", "price": 10}, headers=headers).json()
+etag = client.get(f"/items/{item['id']}").headers["etag"]
+assert client.get("/items/", params={"limit": 5}).json()[0]["name"] == "lamp"
+# Cached reads are invalidated by the write
+assert client.put(f"/items/{item['id']}", json={"price": 12}, headers={**headers, "If-Match": etag}).status_code == 200
+assert client.get(f"/items/{item['id']}").json()["price"] == 12
+assert client.get("/items/", params={"limit": 5}).json()[0]["price"] == 12
+assert client.put(f"/items/{item['id']}", json={"price": 13}, headers={**headers, "If-Match": etag}).status_code == 412
+assert client.get("/items/stats").json()["count"] == 1
+assert client.get("/items/", params={"total": True}).headers["x-total-count"] == "1"
+assert client.post("/items/bulk", json=[{"name": "shade", "price": 1}], headers=headers).json()["succeeded"] == 1
+assert client.delete(f"/items/{item['id']}", headers=headers).status_code == 200
+assert client.get(f"/items/{item['id']}").status_code == 404
+assert published == ["created", "updated", "created", "deleted"], published
+
+user_id = client.get("/users/me", headers=headers).json()["id"]
+assert client.put(f"/users/{user_id}", json={"full_name": "Owner"}, headers=headers).json()["full_name"] == "Owner"
+# A password change revokes the tokens issued before it
+assert client.put(f"/users/{user_id}", json={"password": "second-password"}, headers=headers).status_code == 200
+assert client.get("/users/me", headers=headers).status_code == 401
+headers = login(client, "owner", "second-password")
+assert [user["username"] for user in client.get("/users/", headers=headers).json()] == ["owner"]
+assert client.delete(f"/users/{user_id}", headers=headers).status_code == 200
+assert client.get("/users/me", headers=headers).status_code == 401
+print("async" if AsyncSessionLocal is not None else "sync")
+"""
+
+
+ASYNC_EXTRA = all(importlib.util.find_spec(name) for name in ("aiosqlite", "greenlet"))
+
+
+@pytest.mark.parametrize("database_async", [
+    "false",
+    pytest.param("true", marks=pytest.mark.skipif(not ASYNC_EXTRA, reason="needs the async extra")),
+])
+def test_item_and_user_routes(tmp_path, database_async):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path}/crud.db",
+        DATABASE_ASYNC=database_async,
+        ITEM_CACHE_ENABLED="true",
+        BCRYPT_ROUNDS="4",
+        PYTHONPATH=BACKEND,
+    )
+    result = subprocess.run([sys.executable, "-c", SCENARIO], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == ("async" if database_async == "true" else "sync")
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+from app.crud import items as crud
+
+FIELDNAMES = [column.key for column in crud.EXPORT_COLUMNS]
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEED = """
+import sys
+from app.db.database import Base, engine
+from app.db.init_db import populate
+from app.models import items, users
+Base.metadata.create_all(bind=engine)
+populate(0, int(sys.argv[1]), seed=1)
+"""
+
+# Peak RSS covers what tracemalloc cannot see: the driver, SQLite and other
+# C extensions. Run in a fresh process, so nothing else has raised the peak.
+EXPORT = """
+import asyncio, json, resource
+from app.core.export import export_response
+from app.crud import items as crud
+
+async def drain(response):
+    lines = 0
+    async for chunk in response.body_iterator:
+        lines += chunk.count(b"\\n")
+    return lines
+
+fieldnames = [column.key for column in crud.EXPORT_COLUMNS]
+response = export_response(lambda db: crud.iter_item_rows(db, batch_size=1000), fieldnames, "ndjson", False, "items")
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+lines = asyncio.run(drain(response))
+print(json.dumps({"lines": lines, "before_kb": before, "peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def _export_peak(tmp_path, rows):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path}/export-{rows}.db",
+        PYTHONPATH=BACKEND,
+        # SQLite's page cache and mmap grow with what has been read, up to
+        # their configured size; keep them small so they do not mask the export
+        DB_SQLITE_PRAGMAS=json.dumps({"cache_size": -2048, "mmap_size": 0}),
+    )
+    for code, args in ((SEED, [str(rows)]), (EXPORT, [])):
+        result = subprocess.run([sys.executable, "-c", code, *args], cwd=BACKEND, env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_export_memory_does_not_grow_with_table(tmp_path):
+    small = _export_peak(tmp_path, 10_000)
+    large = _export_peak(tmp_path, 200_000)
+
+    assert (small["lines"], large["lines"]) == (10_000, 200_000)
+    # Twenty times the rows must leave the process peak where it was: only a
+    # yield_per batch and one flush buffer are held at a time
+    assert large["peak_kb"] / small["peak_kb"] < 1.1
+    assert large["peak_kb"] - large["before_kb"] < 16 * 1024
+
+
+def test_export_ndjson_rows(client, auth_headers):
+    client.post("/items/", json={"name": "exported", "price": 1}, headers=auth_headers)
+    response = client.get("/items/export", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    first = json.loads(response.text.splitlines()[0])
+    assert set(first) == set(FIELDNAMES)
+
+
+def test_export_requires_authentication(client):
+    assert client.get("/items/export").status_code == 401
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from app.db.import_items import import_stream, split_lines
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_split_lines_only_breaks_on_line_feed():
+    lines, rest = split_lines('{"name": "a b\x0cc\x85"}\r\n{"name": "d"}\n{"na')
+    assert lines == ['{"name": "a b\x0cc\x85"}\n', '{"name": "d"}\n']
+    assert rest == '{"na'
+
+
+def test_split_lines_holds_back_trailing_carriage_return():
+    lines, rest = split_lines('{"name": "a"}\r')
+    assert lines == [] and rest == '{"name": "a"}\r'
+    lines, rest = split_lines(rest + '\n{"name": "b"}\r\n')
+    assert lines == ['{"name": "a"}\n', '{"name": "b"}\n'] and rest == ""
+
+
+def test_import_stream_counts_lines_across_chunks():
+    body = '{"name": "sep\u2028arated", "price": 1}\r\n{"name": "second", "price": 2}\r\nnot json\r\n'.encode()
+    # Split inside the U+2028 encoding and between a CR and its LF
+    inside = body.index("\u2028".encode()) + 1
+    cut = body.index(b"\r\n") + 1
+    report = asyncio.run(import_stream(_chunks(body[:inside], body[inside:cut], body[cut:]), "ndjson"))
+    assert report.rows_read == 3
+    assert report.rows_imported == 2
+    assert [error.line for error in report.errors] == [3]
+    assert report.checkpoint_line == 2
+
+
+def test_import_progress_streams_checkpoints(client, auth_headers, monkeypatch):
+    from app.core.settings import settings
+    monkeypatch.setattr(settings, "import_batch_size", 2)
+    body = "".join(json.dumps({"name": f"progress {n}", "price": n + 1}) + "\n" for n in range(5))
+    response = client.post("/items/import?progress=true", content=body, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["checkpoint_line"] for event in events[:-1]] == [2, 4, 5]
+    assert events[-1]["rows_imported"] == 5 and events[-1]["checkpoint_line"] == 5
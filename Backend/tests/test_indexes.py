@@ -0,0 +1,26 @@
+import pytest
+
+from app.db.check_indexes import CASES, explain, is_full_scan
+from app.db.database import SessionLocal
+from app.schemas import items
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.mark.parametrize("filters,order_by", CASES.values(), ids=CASES.keys())
+def test_filter_uses_an_index(db, filters, order_by):
+    plan = explain(db, filters, order_by)
+    assert not is_full_scan(plan), "\n".join(plan)
+
+
+def test_unfiltered_listing_is_reported_as_a_scan(db):
+    # The check itself must be able to fail
+    assert is_full_scan(explain(db, items.ItemFilters(), []))
@@ -0,0 +1,2 @@
+def test_metrics_are_opt_in(client):
+    assert client.get("/metrics").status_code == 404
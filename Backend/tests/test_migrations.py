@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def alembic(tmp_path):
+    """Run an alembic command against a fresh SQLite file; env.py reads the
+    URL from the app settings, so each run gets its own process"""
+    path = tmp_path / "migrations.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+
+    def run(*args):
+        result = subprocess.run([sys.executable, "-m", "alembic", *args], cwd=BACKEND, env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stdout + result.stderr
+        return result.stdout + result.stderr
+
+    run.path = path
+    return run
+
+
+def _columns(path, table):
+    with sqlite3.connect(path) as connection:
+        return {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+
+
+def test_upgrade_from_empty_matches_models(alembic):
+    alembic("upgrade", "head")
+    assert "No new upgrade operations detected" in alembic("check")
+    with sqlite3.connect(alembic.path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM item_stats").fetchone() == (16,)
+
+
+def test_initial_schema_upgrades_to_head(alembic):
+    # A database from before migrations: the 0001 tables with existing rows
+    alembic("upgrade", "0001")
+    assert "token_version" not in _columns(alembic.path, "users")
+    with sqlite3.connect(alembic.path) as connection:
+        connection.execute("INSERT INTO users (username, email, hashed_password, is_active) VALUES ('old', 'old@example.com', 'x', 1)")
+        connection.execute("INSERT INTO items (name, price, is_available) VALUES ('old', 5, 1)")
+
+    alembic("upgrade", "head")
+    assert "No new upgrade operations detected" in alembic("check")
+    with sqlite3.connect(alembic.path) as connection:
+        assert connection.execute("SELECT token_version FROM users WHERE username = 'old'").fetchone() == (0,)
+        assert connection.execute("SELECT SUM(item_count) FROM item_stats").fetchone() == (1,)
+
+
+def test_downgrade_to_base(alembic):
+    alembic("upgrade", "head")
+    alembic("downgrade", "base")
+    with sqlite3.connect(alembic.path) as connection:
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables <= {"alembic_version"}
@@ -0,0 +1,37 @@
+import pstats
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import ProfilingMiddleware, profile_threadpool_endpoints, sign_profile_token
+
+
+def busy_sync_endpoint():
+    return {"total": sum(index * index for index in range(20_000))}
+
+
+def _profiled_app(output_dir):
+    app = FastAPI()
+    app.get("/sync")(busy_sync_endpoint)
+    profile_threadpool_endpoints(app)
+    app.add_middleware(ProfilingMiddleware, output_dir=str(output_dir))
+    return TestClient(app)
+
+
+def test_sync_endpoint_is_profiled(tmp_path):
+    client = _profiled_app(tmp_path)
+    token = sign_profile_token(int(time.time()) + 60)
+    # Twice: a second request must not find a profiler left enabled
+    for _ in range(2):
+        response = client.get("/sync", headers={"X-Profile-Token": token})
+        assert response.status_code == 200
+        stats = pstats.Stats(str(tmp_path / response.headers["x-profile-file"]))
+        assert any(name == "busy_sync_endpoint" for _, _, name in stats.stats)
+
+
+def test_unprofiled_request_writes_nothing(tmp_path):
+    response = _profiled_app(tmp_path).get("/sync")
+    assert response.status_code == 200
+    assert "x-profile-file" not in response.headers
+    assert not any(tmp_path.iterdir())
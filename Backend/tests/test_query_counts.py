@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.core.cache import MemoryBackend
+from app.crud import items as crud
+from app.db.database import async_engine, engine
+from app.db.init_db import populate
+
+
+@contextmanager
+def count_statements():
+    """Count the SQL statements sent to the database inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Both engines: with DATABASE_ASYNC on, the routes run on the async one
+    engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+    for db_engine in engines:
+        event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for db_engine in engines:
+            event.remove(db_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded():
+    populate(3, 100, seed=3)
+
+
+@pytest.fixture
+def warm_headers(client, auth_headers):
+    # The first authenticated request loads the principal; later ones reuse it
+    assert client.get("/users/me", headers=auth_headers).status_code == 200
+    return auth_headers
+
+
+def _statements(request):
+    with count_statements() as statements:
+        response = request()
+    assert response.status_code < 400, response.text
+    return len(statements)
+
+
+def test_item_list_is_one_query_at_any_page_size(client):
+    counts = {limit: _statements(lambda: client.get("/items/", params={"limit": limit})) for limit in (5, 50)}
+    assert counts == {5: 1, 50: 1}
+
+
+def test_user_list_is_one_query_at_any_page_size(client, warm_headers):
+    counts = {limit: _statements(lambda: client.get("/users/", params={"limit": limit}, headers=warm_headers)) for limit in (2, 50)}
+    assert counts == {2: 1, 50: 1}
+
+
+def test_item_detail_is_one_query_and_none_when_cached(client, monkeypatch):
+    assert _statements(lambda: client.get("/items/3")) == 1
+
+    monkeypatch.setattr(crud.item_cache, "backend", MemoryBackend())
+    monkeypatch.setattr(crud.item_cache, "enabled", True)
+    assert _statements(lambda: client.get("/items/4")) == 1
+    assert _statements(lambda: client.get("/items/4")) == 0
+
+
+def test_item_writes_are_one_statement_each(client, warm_headers):
+    created = client.post("/items/", json={"name": "counted", "price": 3}, headers=warm_headers).json()
+    assert _statements(lambda: client.post("/items/", json={"name": "counted", "price": 3}, headers=warm_headers)) == 1
+    assert _statements(lambda: client.put(f"/items/{created['id']}", json={"price": 4}, headers=warm_headers)) == 1
+    assert _statements(lambda: client.delete(f"/items/{created['id']}", headers=warm_headers)) == 1
+
+
+def test_bulk_create_is_one_statement_at_any_size(client, warm_headers):
+    for size in (10, 100):
+        rows = [{"name": f"bulk {size} {n}", "price": n + 1} for n in range(size)]
+        with count_statements() as statements:
+            response = client.post("/items/bulk", json=rows, headers=warm_headers)
+        assert response.status_code == 200, response.text
+        assert len(statements) == 1
+        # Ids are matched to the rows they were created for
+        for result in response.json()["results"][::17]:
+            assert client.get(f"/items/{result['id']}").json()["name"] == rows[result["index"]]["name"]
+
+
+def test_bulk_update_statements_do_not_grow_with_size(client, warm_headers):
+    counts = {size: _statements(lambda: client.patch("/items/bulk", json=[{"id": item_id, "price": 7} for item_id in range(1, size + 1)], headers=warm_headers)) for size in (5, 50)}
+    assert counts == {5: 2, 50: 2}
+
+
+def _register(client, name):
+    return client.post("/register/", json={"username": name, "email": f"{name}@example.com", "password": "counted-password"})
+
+
+def test_register_is_one_statement(client):
+    with count_statements() as statements:
+        response = _register(client, "counted-new")
+    assert response.status_code == 201, response.text
+    assert len(statements) == 1
+
+
+def test_register_reports_the_conflicting_field(client):
+    _register(client, "counted-taken")
+    response = _register(client, "counted-taken")
+    assert response.status_code == 400 and response.json()["detail"] == "Email already registered"
+    response = client.post("/register/", json={"username": "counted-taken", "email": "other@example.com", "password": "counted-password"})
+    assert response.status_code == 400 and response.json()["detail"] == "Username already taken"
+
+
+def test_user_writes_are_one_statement_each(client, warm_headers):
+    user_id = _register(client, "counted-user").json()["id"]
+    assert _statements(lambda: client.put(f"/users/{user_id}", json={"full_name": "Counted"}, headers=warm_headers)) == 1
+    # A credential change also bumps token_version, in the same UPDATE
+    assert _statements(lambda: client.put(f"/users/{user_id}", json={"username": "counted-renamed"}, headers=warm_headers)) == 1
+    assert _statements(lambda: client.put(f"/users/{user_id}", json={"password": "changed-password"}, headers=warm_headers)) == 1
+    assert _statements(lambda: client.delete(f"/users/{user_id}", headers=warm_headers)) == 1
@@ -0,0 +1,21 @@
+import pytest
+
+from app.core import security
+
+
+@pytest.fixture
+def no_hash_slots(monkeypatch):
+    monkeypatch.setattr(security, "_hash_slots", security.threading.BoundedSemaphore(1))
+    monkeypatch.setattr(security.settings, "password_hash_queue_timeout_seconds", 0.01)
+    security._hash_slots.acquire()
+
+
+def test_busy_hashing_raises_domain_error(no_hash_slots):
+    with pytest.raises(security.HashingBusy):
+        security.get_password_hash("secret")
+
+
+def test_busy_hashing_is_503_with_retry_after(client, auth_headers, no_hash_slots):
+    response = client.post("/token/", data={"username": "tester", "password": "whatever"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"